@@ -0,0 +1,211 @@
+import json
+import platform
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from datetime import datetime, timezone
+from statistics import median
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from gameinfo import classify_guess, classify_letter, filter_impossible_words
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary
+from wordlealgorithm import make_algorithm
+from wordle import GameState
+
+# vocabularies the pattern matrix of which takes more memory are not solved
+max_matrix_words = 20000
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="runs the benchmarks")
+    run.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    run.add_argument(
+        "--sizes",
+        type=int,
+        nargs="*",
+        default=[10000, 100000],
+        help="sizes of generated vocabularies to run the benchmarks on",
+    )
+    run.add_argument(
+        "--repeat", type=int, default=5, help="number of measurements per benchmark"
+    )
+    run.add_argument("--games", type=int, default=5, help="number of games to simulate")
+    run.add_argument("--seed", type=int, default=0, help="seed of random generator")
+    run.add_argument(
+        "--out", default="benchmark.json", help="path to the file with results"
+    )
+    compare = commands.add_parser("compare", help="compares results of two runs")
+    compare.add_argument("old", help="path to the results of the baseline run")
+    compare.add_argument("new", help="path to the results of the run to check")
+    return parser.parse_args()
+
+
+def generate_vocabulary(
+    vocabulary: Vocabulary, size: int, rng: np.random.Generator
+) -> Vocabulary:
+    """
+    Generates a vocabulary of distinct words drawing letters of each position
+    independently with frequencies of the letters at the position in the vocabulary.
+    """
+    length, alphabet_size = vocabulary.length, len(vocabulary.alphabet)
+    frequencies = [
+        np.bincount(vocabulary.codes[:, p], minlength=alphabet_size) / len(vocabulary)
+        for p in range(length)
+    ]
+    codes = np.zeros((0, length), dtype=np.uint8)
+    while len(codes) < size:
+        sample = np.stack(
+            [rng.choice(alphabet_size, size, p=f) for f in frequencies], axis=1
+        )
+        codes = np.unique(np.concatenate([codes, sample.astype(np.uint8)]), axis=0)
+    return Vocabulary(codes[rng.permutation(len(codes))[:size]], vocabulary.alphabet)
+
+
+def measure(function: Callable, repeat: int) -> Dict:
+    """
+    Times the function several times and measures the peak of memory
+    allocated during a separate call.
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "seconds_min": min(times),
+        "seconds_median": median(times),
+        "repeat": repeat,
+        "peak_bytes": peak,
+    }
+
+
+def benchmarks(
+    vocabulary: Vocabulary, games: int, rng: np.random.Generator
+) -> List[Tuple[str, Optional[Callable]]]:
+    """
+    Benchmarks for the vocabulary: functions to measure, None if
+    the benchmark is not feasible for the vocabulary. Letters are classified
+    for 1000 random pairs of words, games are played for random target words.
+    """
+    import pandas as pd
+    from greedy import add_frequency_column
+    from biggest_cut import first_turn_histograms
+
+    words = vocabulary.words
+    table = pd.DataFrame({"word": words})
+    pairs = [tuple(map(str, rng.choice(words, 2))) for _ in range(1000)]
+    guess, target = pairs[0]
+    info = classify_guess(guess, target)
+    targets = [str(word) for word in rng.choice(words, games)]
+    solvable = len(vocabulary) <= max_matrix_words
+
+    def classify():
+        for guess, target in pairs:
+            for i, l in enumerate(guess):
+                classify_letter(l, i, target)
+
+    def estimate_cuts():
+        # histograms of the first turn are shared, each call should count them
+        first_turn_histograms.clear()
+        make_algorithm("cutting", vocabulary).estimate_cuts([])
+
+    def play(name: str) -> Callable:
+        def play_games():
+            first_turn_histograms.clear()
+            guesser = make_algorithm(name, vocabulary)
+            for target in targets:
+                game_state = GameState(target, vocabulary.alphabet)
+                while game_state.number_of_attempts < 4 * 6:
+                    guess = guesser.guess(game_state.game_info)
+                    game_state.add_guess(guess)
+                    if guess == target:
+                        break
+
+        return play_games
+
+    return [
+        ("classify_letter", classify),
+        ("filter_impossible_words", lambda: filter_impossible_words(table, info)),
+        ("add_frequency_column", lambda: add_frequency_column(table.copy())),
+        ("estimate_cuts_first_turn", estimate_cuts if solvable else None),
+        ("greedy_games", play("greedy")),
+        ("cutting_games", play("cutting") if solvable else None),
+    ]
+
+
+def run(args: Namespace) -> Dict:
+    "Runs all the benchmarks on the vocabulary and the generated ones."
+    rng = np.random.default_rng(args.seed)
+    vocabulary = load_vocabulary(args.t)
+    vocabularies = [("real", vocabulary)] + [
+        (f"synthetic-{size}", generate_vocabulary(vocabulary, size, rng))
+        for size in args.sizes
+    ]
+    results = {}
+    for name, words in vocabularies:
+        for benchmark, function in benchmarks(words, args.games, rng):
+            key = f"{name}/{benchmark}"
+            if function is None:
+                results[key] = {"words": len(words), "skipped": True}
+                continue
+            # the first call computes and caches the pattern matrix
+            function()
+            results[key] = {"words": len(words), **measure(function, args.repeat)}
+            print(f"{key}: {results[key]['seconds_min']:.6f} s")
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "seed": args.seed,
+        "games": args.games,
+        "results": results,
+    }
+
+
+def compare(old: Dict, new: Dict) -> List[str]:
+    "Lines of the table comparing time and memory of the benchmarks of two runs."
+    lines = [f"{'benchmark':50} {'old s':>10} {'new s':>10} {'time':>7} {'memory':>7}"]
+    for key in sorted(set(old["results"]) & set(new["results"])):
+        a, b = old["results"][key], new["results"][key]
+        if a.get("skipped") or b.get("skipped"):
+            lines.append(f"{key:50} skipped")
+            continue
+        time = b["seconds_min"] / a["seconds_min"]
+        memory = b["peak_bytes"] / max(1, a["peak_bytes"])
+        lines.append(
+            f"{key:50} {a['seconds_min']:10.6f} {b['seconds_min']:10.6f} {time:6.2f}x {memory:6.2f}x"
+        )
+    for key in sorted(set(old["results"]) ^ set(new["results"])):
+        lines.append(f"{key:50} only in {'old' if key in old['results'] else 'new'}")
+    return lines
+
+
+def main():
+    args = parse_args()
+    if args.command == "run":
+        report = run(args)
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        print(*compare(old, new), sep="\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,103 @@
-from statistics import mean, mode, median
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
 from argparse import ArgumentParser, Namespace
+from threading import Lock
+from time import perf_counter
 
-import pandas as pd
-from tqdm import tqdm
+import numpy as np
 
-from gameinfo import (
-    Letter,
-    classify_letter,
-    filter_impossible_words,
-    load_possible_words,
+from gameinfo import Information
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary
+from parallel import ShardedScorer
+from patterns import (
+    block_rows,
+    load_pattern_matrix,
+    pattern_matrix_path,
+    pattern_statistics,
+    number_of_patterns,
+    histogram_mean,
+    histogram_max,
+    histogram_mode,
+    histogram_median,
 )
-from wordlealgorithm import WordleAlgorithm
+from wordlealgorithm import WordleAlgorithm, cached, top_indices
 from interaction import interact
+from profiling import profiled, enable, stage
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 supported_statistics = {
-    "mean": mean,
-    "max": max,
-    "mode": mode,
-    "median": median,
+    "mean": histogram_mean,
+    "max": histogram_max,
+    "mode": histogram_mode,
+    "median": histogram_median,
 }
 
+# histograms of feedback patterns of all the words over all the words,
+# counted once per process and shared by the algorithms, keyed by the pattern matrix
+first_turn_histograms: Dict[str, np.ndarray] = {}
+first_turn_lock = Lock()
+
+# quantile of the normal distribution for 95% confidence intervals
+confidence_z = 1.96
+
+# statistics which can be estimated from samples of targets, the mode
+# of a sample is too far from the one of all the targets
+estimable_statistics = ("mean", "max", "median")
+
+
+def sampled_mean(
+    histograms: np.ndarray, population: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Unbiased estimate of the average number of words left: the share of pairs
+    of distinct sampled targets in the same bucket estimates the one of all
+    the targets. The standard error is the jackknife one over the sampled
+    targets, leaving out a target of a bucket of size h removes 2(h - 1) pairs.
+    """
+    sample = int(histograms[0].sum()) if len(histograms) else 1
+    histograms = histograms.astype(np.float64)
+    pairs = (histograms * (histograms - 1)).sum(axis=1)
+    estimates = 1 + (population - 1) * pairs / max(1, sample * (sample - 1))
+    if sample >= population:
+        return estimates, np.zeros(len(histograms))
+    if sample < 3:
+        return estimates, np.full(len(histograms), np.inf)
+    left_out = 1 + (population - 1) * (pairs[:, np.newaxis] - 2 * (histograms - 1)) / (
+        (sample - 1) * (sample - 2)
+    )
+    average = (histograms * left_out).sum(axis=1, keepdims=True) / sample
+    variance = (
+        (sample - 1) / sample * (histograms * (left_out - average) ** 2).sum(axis=1)
+    )
+    errors = np.sqrt(variance * (1 - sample / population))
+    return estimates, confidence_z * errors
+
+
+def sampled_estimates(
+    histograms: np.ndarray, population: int, stat: str
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Estimates the statistic of words left from histograms of feedback patterns
+    over a sample of targets drawn without replacement from the population
+    of targets. Returns the estimates and half-widths of their confidence
+    intervals: see sampled_mean for the mean, the standard error of the share
+    of targets in a bucket is used for the other statistics, which are sizes
+    of buckets.
+    """
+    if stat not in estimable_statistics:
+        raise ValueError(f"Not supported statistic for sampling: {stat}")
+    if stat == "mean":
+        return sampled_mean(histograms, population)
+    sample = int(histograms[0].sum()) if len(histograms) else 1
+    scale = population / sample
+    estimates = supported_statistics[stat](histograms * scale).astype(np.float64)
+    correction = np.sqrt((population - sample) / max(1, population - 1))
+    share = np.clip(estimates / population, 0, 1)
+    error = population * np.sqrt(share * (1 - share) / sample)
+    return estimates, confidence_z * error * correction
+
 
 def parse_args() -> Namespace:
     parser = ArgumentParser()
@@ -38,7 +115,55 @@ def parse_args() -> Namespace:
     parser.add_argument(
         "--n", type=int, default=15, help="number of words to show on each iteration"
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="number of processes to score guesses on",
+    )
+    parser.add_argument(
+        "--time-limit",
+        type=float,
+        default=None,
+        help="seconds to refine the ranking for, all guesses are scored if not specified",
+    )
+    parser.add_argument(
+        "--memory-limit",
+        type=int,
+        default=None,
+        help="megabytes of memory for temporary arrays, 256 if not specified",
+    )
+    parser.add_argument(
+        "--approx",
+        action="store_true",
+        help="estimate the statistic from samples of target words",
+    )
+    parser.add_argument(
+        "--sample",
+        type=int,
+        default=256,
+        help="number of target words in the first sample of the approximation",
+    )
+    parser.add_argument(
+        "--seed", type=int, default=None, help="seed of the sampling of target words"
+    )
+    parser.add_argument(
+        "--speculate",
+        type=int,
+        default=0,
+        help="number of most likely feedbacks to rank the next turn for while the feedback is typed in",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages per turn and per game to",
+    )
+    args = parser.parse_args()
+    if args.approx and args.stat not in estimable_statistics:
+        parser.error(f"argument --approx: not supported for --stat {args.stat}")
+    return args
 
 
 class CuttingAlgorithm(WordleAlgorithm):
@@ -47,67 +172,397 @@ class CuttingAlgorithm(WordleAlgorithm):
     is going to be left if the word is used as a guess: the fewer words left
     the better the guess. By default the ranking of guesses is performed based
     on average number words left, but following statistics can be specified: max,
-    mode and median.
+    mode and median. Guesses can be scored on several processes.
+
+    Histograms of feedback patterns of the candidates as guesses over the
+    candidates as targets are kept between turns if they fit into the memory
+    limit and guesses are scored in the process: eliminated targets are
+    subtracted from them, so the statistics of later turns cost as many words
+    as are eliminated rather than left. The histograms of the first turn
+    are counted once per process and shared by all the algorithms.
+    Temporary arrays are bounded by the memory limit in bytes,
+    the default limit of the patterns module is used if not specified.
+
+    In the approximate mode the statistic is estimated from a random sample
+    of target words with confidence intervals. The sample is doubled round by
+    round only for the guesses still contending for the top, the way of
+    successive halving, so the full number of targets is reached for a few
+    guesses only. The mode is not estimated from samples.
     """
-    best_first_guess = "норка" 
-    words_limit = 200
 
-    def __init__(self, possible_words: pd.DataFrame, stat: str = "mean") -> None:
+    # number of top guesses the sample is enlarged for when all guesses are ranked
+    contenders = 15
+
+    def __init__(
+        self,
+        possible_words: Union["pd.DataFrame", Vocabulary],
+        stat: str = "mean",
+        workers: int = 1,
+        memory_limit: Optional[int] = None,
+        approx: bool = False,
+        sample_size: int = 256,
+        seed: Optional[int] = None,
+    ) -> None:
+        if stat not in supported_statistics:
+            raise ValueError(f"Not supported statistic: {stat}")
+        if approx and stat not in estimable_statistics:
+            raise ValueError(f"Not supported statistic for sampling: {stat}")
         super().__init__(possible_words)
         self.stat = stat
+        self.memory_limit = memory_limit
+        self.approx = approx
+        self.sample_size = sample_size
+        self.seed = seed
+        self.patterns_count = number_of_patterns(self.vocabulary.length)
+        self.patterns = load_pattern_matrix(self.vocabulary, memory_limit)
+        self.scorer: Optional[ShardedScorer] = None
+        if workers > 1:
+            path = pattern_matrix_path(self.vocabulary)
+            self.scorer = ShardedScorer(
+                path, len(self.vocabulary), workers, self.patterns_count, memory_limit
+            )
+
+    def reset(self) -> None:
+        super().reset()
+        # rows are the candidates in their order, the array is never changed in place
+        self.histograms: Optional[np.ndarray] = None
+
+    def fork(self) -> "CuttingAlgorithm":
+        "The pool of processes is not shared, the copy scores guesses by itself"
+        fork = super().fork()
+        fork.scorer = None
+        return fork
+
+    def count_patterns(self, guesses: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        "Histograms of feedback patterns of the guesses over the targets"
+        return pattern_statistics(
+            self.patterns,
+            guesses,
+            targets,
+            {"histograms": lambda histograms: histograms.astype(np.int32)},
+            self.patterns_count,
+            self.memory_limit,
+        )["histograms"].reshape(len(guesses), self.patterns_count)
+
+    def keeps_histograms(self) -> bool:
+        """
+        Whether histograms are kept between turns: guesses are scored
+        in the process and histograms of all the words fit into the memory limit
+        """
+        rows = block_rows(4 * self.patterns_count, self.memory_limit)
+        return self.scorer is None and rows >= len(self.vocabulary)
 
-    def rank_guesses(self, info: List[Letter]) -> pd.DataFrame:
+    @profiled("biggest_cut.pattern_counts")
+    def pattern_counts(self, count: bool = True) -> Optional[np.ndarray]:
+        """
+        Histograms of feedback patterns of the candidates as guesses over
+        the candidates as targets. Counted when needed for the first time
+        in a game unless count is False, the ones of the first turn are shared.
+        None if they are not kept or not counted yet.
+        """
+        if self.histograms is None and self.keeps_histograms():
+            if len(self.candidates) < len(self.vocabulary):
+                if count:
+                    self.histograms = self.count_patterns(
+                        self.candidates, self.candidates
+                    )
+            else:
+                path = pattern_matrix_path(self.vocabulary)
+                with first_turn_lock:
+                    if count and path not in first_turn_histograms:
+                        first_turn_histograms[path] = self.count_patterns(
+                            self.candidates, self.candidates
+                        )
+                self.histograms = first_turn_histograms.get(path)
+        return self.histograms
+
+    def keep_histograms(self, candidates: np.ndarray, histograms: np.ndarray) -> None:
+        "Keeps histograms of all the candidates counted by blocks"
+        if candidates is not self.candidates or self.histograms is not None:
+            return
+        if len(candidates) == len(self.vocabulary):
+            path = pattern_matrix_path(self.vocabulary)
+            with first_turn_lock:
+                histograms = first_turn_histograms.setdefault(path, histograms)
+        self.histograms = histograms
+
+    @profiled("biggest_cut.eliminate")
+    def eliminate(self, eliminated: np.ndarray) -> None:
+        """
+        Subtracts the eliminated targets from the histograms of the candidates
+        left, or counts them anew if fewer targets are left than eliminated.
+        """
+        if self.histograms is None:
+            return
+        if len(eliminated) > len(self.candidates):
+            self.histograms = self.count_patterns(self.candidates, self.candidates)
+        else:
+            # the candidates left are the ones of the rows but the eliminated
+            rows = np.isin(
+                self.histogram_candidates(eliminated), eliminated, invert=True
+            )
+            histograms = self.histograms[rows]
+            histograms -= self.count_patterns(self.candidates, eliminated)
+            self.histograms = histograms
+
+    def histogram_candidates(self, eliminated: np.ndarray) -> np.ndarray:
+        "Candidates of the rows of histograms before the words were eliminated"
+        return np.union1d(self.candidates, eliminated)
+
+    def cache_key(self) -> Tuple:
+        if self.approx:
+            return super().cache_key() + (self.stat, self.sample_size, self.seed)
+        return super().cache_key() + (self.stat,)
+
+    @profiled("biggest_cut.rank_guesses")
+    @cached
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
         "Ranks all possible guesses based on statistic chosen"
-        self.possible_words = filter_impossible_words(self.possible_words, info)
-        if len(self.possible_words) < CuttingAlgorithm.words_limit:
-            print(len(self.possible_words))
-            cuts_estimation = self.estimate_cuts(info)
-            return cuts_estimation.sort_values(self.stat)
-        return pd.DataFrame({"word": [CuttingAlgorithm.best_first_guess]})
-
-    def guess(self, info: List[Letter]) -> str:
+        if self.approx:
+            return self.rank_sampled(info, self.contenders)
+        cuts_estimation = self.estimate_cuts(info)
+        return cuts_estimation.sort_values(self.stat, kind="stable")
+
+    def select(self, info: Information, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Selects k best guesses computing the chosen statistic only.
+        Returns their indices in the vocabulary and values of the statistic.
+        """
+        candidates = self.update(info)
+        if self.approx:
+            estimates, _, samples = self.sampled_statistics(candidates, max(1, k))
+            best = np.lexsort((estimates, -samples))[:k]
+            return candidates[best], estimates[best]
+        statistic = self.cut_statistics(candidates, [self.stat])[self.stat]
+        best = top_indices(statistic, k)
+        return candidates[best], statistic[best]
+
+    @profiled("biggest_cut.top_guesses")
+    @cached
+    def top_guesses(self, info: Information, k: int) -> "pd.DataFrame":
+        "Ranks only k best guesses by the statistic chosen"
+        import pandas as pd
+
+        if self.approx:
+            return self.rank_sampled(info, k).head(k)
+        indices, statistic = self.select(info, k)
+        return pd.DataFrame(
+            {"word": self.all_words["word"].to_numpy()[indices], self.stat: statistic}
+        )
+
+    @profiled("biggest_cut.guess")
+    @cached
+    def guess(self, info: Information) -> str:
         "Returns the most prominent word based on statistic chosen"
-        self.possible_words = filter_impossible_words(self.possible_words, info)
-        if len(self.possible_words) < CuttingAlgorithm.words_limit:
-            cuts_estimation = self.estimate_cuts(info)
-            return cuts_estimation.idxmin()[self.stat]
-        return CuttingAlgorithm.best_first_guess
+        indices, _ = self.select(info, 1)
+        return self.vocabulary.word(indices[0])
 
-    def estimate_cuts(self, info: List[Letter]) -> pd.DataFrame:
-        "For each word computes statistics of expected words left"
-        cuts_estimation = {}
-        words = filter_impossible_words(self.possible_words, info)
-        words_list = words["word"].to_list()
-        for guess in tqdm(words_list):
-            distribution = [
-                cut_size(guess, target, info, words) for target in words_list
-            ]
-            cuts_estimation[guess] = {
-                name: f(distribution) for name, f in supported_statistics.items()
+    @profiled("biggest_cut.sampled_statistics")
+    def sampled_statistics(
+        self, candidates: np.ndarray, n: int
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Estimates the statistic for each of the candidates as a guess from
+        samples of the candidates as targets. After each round the guesses
+        out of the better half and the ones the confidence interval of which
+        lies above the intervals of the top n are dropped, the sample is doubled
+        for the rest. Returns the estimates, half-widths of confidence intervals
+        and sizes of the samples they are computed from.
+        """
+        population = len(candidates)
+        targets = np.random.default_rng(self.seed).permutation(candidates)
+        estimates = np.zeros(population)
+        errors = np.zeros(population)
+        samples = np.zeros(population, dtype=np.int64)
+        contenders = np.arange(population)
+        sample = self.sample_size
+        while len(contenders):
+            sample = min(sample, population)
+            statistics = pattern_statistics(
+                self.patterns,
+                candidates[contenders],
+                np.sort(targets[:sample]),
+                {
+                    "estimate": lambda h: sampled_estimates(h, population, self.stat)[
+                        0
+                    ],
+                    "error": lambda h: sampled_estimates(h, population, self.stat)[1],
+                },
+                self.patterns_count,
+                self.memory_limit,
+            )
+            estimates[contenders] = statistics["estimate"]
+            errors[contenders] = statistics["error"]
+            samples[contenders] = sample
+            if sample == population or len(contenders) <= n:
+                break
+            estimate, error = estimates[contenders], errors[contenders]
+            threshold = np.partition(estimate + error, n - 1)[n - 1]
+            order = np.argsort(estimate, kind="stable")
+            kept = order[: max(n, len(order) // 2)]
+            contending = estimate[kept] - error[kept] <= threshold
+            contending[:n] = True
+            contenders = np.sort(contenders[kept[contending]])
+            sample *= 2
+        return estimates, errors, samples
+
+    def rank_sampled(self, info: Information, n: int) -> "pd.DataFrame":
+        """
+        Ranks the guesses by the estimates of the statistic, the guesses
+        estimated from larger samples first. The top n are the most accurate.
+        """
+        import pandas as pd
+
+        candidates = self.update(info)
+        estimates, errors, samples = self.sampled_statistics(candidates, max(1, n))
+        order = np.lexsort((estimates, -samples))
+        return pd.DataFrame(
+            {
+                "word": self.all_words["word"].to_numpy()[candidates[order]],
+                self.stat: estimates[order],
+                "low": (estimates - errors)[order],
+                "high": (estimates + errors)[order],
+                "sample": samples[order],
             }
-        return pd.DataFrame(cuts_estimation).transpose().reset_index()
+        )
 
+    def histogram_statistics(
+        self, histograms: np.ndarray, statistics: Dict
+    ) -> Dict[str, np.ndarray]:
+        "Computes the statistics from rows of histograms in blocks"
+        rows = block_rows(16 * self.patterns_count, self.memory_limit)
+        results: Dict[str, List[np.ndarray]] = {name: [] for name in statistics}
+        for start in range(0, len(histograms), rows):
+            block = histograms[start : start + rows].astype(np.int64)
+            for name, f in statistics.items():
+                results[name].append(f(block))
+        return {
+            name: np.concatenate(values) if values else np.zeros(0)
+            for name, values in results.items()
+        }
 
-def cut_size(
-    guess: str, correct_word: str, info: List[Letter], words: pd.DataFrame
-) -> int:
-    "Computes number of words left for specified guess and correct word"
-    words = filter_impossible_words(
-        words.copy(),
-        info + [classify_letter(l, i, correct_word) for i, l in enumerate(guess)],
-    )
-    return len(words)
+    @profiled("biggest_cut.cut_statistics")
+    def cut_statistics(
+        self,
+        candidates: np.ndarray,
+        names: List[str],
+        positions: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        For each of the guesses, the candidates at the positions or all of them
+        if not specified, computes the statistics of words left from histograms
+        of feedback patterns the word partitions the candidates into.
+        The histograms kept between turns are used for the candidates
+        of the algorithm, they are counted when all the candidates are scored.
+        """
+        statistics = {name: supported_statistics[name] for name in names}
+        histograms = None
+        if candidates is self.candidates:
+            # counting is as costly as scoring all the candidates at once
+            histograms = self.pattern_counts(count=positions is None)
+        if positions is None:
+            positions = np.arange(len(candidates))
+        if histograms is not None:
+            return self.histogram_statistics(histograms[positions], statistics)
+        if self.scorer is not None:
+            return self.scorer.statistics(candidates, statistics, positions)
+        return pattern_statistics(
+            self.patterns,
+            candidates[positions],
+            candidates,
+            statistics,
+            self.patterns_count,
+            self.memory_limit,
+        )
+
+    def letter_frequency_order(self, candidates: np.ndarray) -> np.ndarray:
+        """
+        Orders the candidates by total frequencies among the candidates
+        of letters in them, the most frequent first. A cheap estimate of the cut.
+        """
+        letter_presence = self.vocabulary.letter_presence[candidates]
+        scores = letter_presence @ letter_presence.sum(axis=0)
+        return np.argsort(-scores, kind="stable")
+
+    def rank_progressively(
+        self,
+        info: Information,
+        n: int,
+        deadline: Optional[float] = None,
+        block_size: int = 256,
+    ) -> Iterator[Tuple["pd.DataFrame", bool]]:
+        """
+        Yields the guesses with the most frequent letters first, then scores
+        the guesses in blocks in the same order and yields the best of them
+        by the statistic chosen after each block until all of them are scored
+        or the deadline passes. The final ranking is the one of top_guesses.
+        Histograms to be kept between turns are counted block by block
+        and kept once all the guesses are scored.
+        """
+        import pandas as pd
+
+        if self.approx:
+            yield self.top_guesses(info, n), True
+            return
+        candidates = self.update(info)
+        words = self.all_words["word"].to_numpy()[candidates]
+        order = self.letter_frequency_order(candidates)
+        yield pd.DataFrame({"word": words[order[:n]]}), len(candidates) == 0
+
+        statistics = {self.stat: supported_statistics[self.stat]}
+        counts = None
+        if self.pattern_counts(count=False) is None and self.keeps_histograms():
+            counts = np.empty((len(candidates), self.patterns_count), np.int32)
+        statistic = np.full(len(candidates), np.inf)
+        scored = np.zeros(len(candidates), dtype=bool)
+        for start in range(0, len(candidates), block_size):
+            if deadline is not None and perf_counter() > deadline:
+                return
+            block = order[start : start + block_size]
+            with stage("biggest_cut.score_block"):
+                if counts is None:
+                    results = self.cut_statistics(candidates, [self.stat], block)
+                else:
+                    counts[block] = self.count_patterns(candidates[block], candidates)
+                    results = self.histogram_statistics(counts[block], statistics)
+                statistic[block] = results[self.stat]
+            scored[block] = True
+            if counts is not None and scored.all():
+                self.keep_histograms(candidates, counts)
+            best = top_indices(statistic, min(n, int(scored.sum())))
+            ranking = {"word": words[best], self.stat: statistic[best]}
+            yield pd.DataFrame(ranking), bool(scored.all())
+
+    @profiled("biggest_cut.estimate_cuts")
+    def estimate_cuts(self, info: Information) -> "pd.DataFrame":
+        "For each word computes statistics of expected words left"
+        import pandas as pd
+
+        candidates = self.update(info)
+        cuts_estimation = {"word": self.all_words["word"].to_numpy()[candidates]}
+        cuts_estimation.update(
+            self.cut_statistics(candidates, list(supported_statistics))
+        )
+        return pd.DataFrame(cuts_estimation)
 
 
 def main():
     args = parse_args()
+    profiler = enable() if args.profile is not None else None
     words_to_show: int = args.n
     stat = args.stat
     words_path: str = args.t
 
-    words = load_possible_words(words_path)
-    guesser = CuttingAlgorithm(words, stat)
-    interact(guesser, words_to_show)
+    words = load_vocabulary(words_path)
+    memory_limit = None if args.memory_limit is None else args.memory_limit * 2**20
+    guesser = CuttingAlgorithm(
+        words, stat, args.workers, memory_limit, args.approx, args.sample, args.seed
+    )
+    interact(guesser, words_to_show, args.time_limit, args.speculate)
+    if guesser.scorer is not None:
+        guesser.scorer.close()
+    if profiler is not None:
+        profiler.save(args.profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,301 @@
+import mmap
+import os
+import struct
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from typing import Optional, Union, TYPE_CHECKING
+
+import numpy as np
+
+from gameinfo import Constraint, Information
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary
+from patterns import (
+    cache_directory,
+    compute_patterns,
+    load_pattern_matrix,
+    number_of_patterns,
+    pattern_of_letters,
+    pattern_statistics,
+    solved_pattern,
+)
+from wordlealgorithm import WordleAlgorithm
+from biggest_cut import CuttingAlgorithm, supported_statistics
+from profiling import profiled, enable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# magic, version, number of nodes, number of edges, statistic, vocabulary digest
+header_format = "<8sIII8s64s"
+header_size = 128
+magic = b"WRDLTREE"
+version = 3
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--stat",
+        default="mean",
+        choices=supported_statistics.keys(),
+        help="statistic to use.",
+    )
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="path to the file with the tree, the cache directory if not specified",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages of building the tree to",
+    )
+    return parser.parse_args()
+
+
+class DecisionTree:
+    """
+    Game tree of the cutting algorithm solved for all the words in advance.
+    Node n makes the guess guesses[n], its children are listed by edges
+    first_edge[n]...first_edge[n + 1] - 1 sorted by feedback pattern.
+    """
+
+    def __init__(
+        self,
+        guesses: np.ndarray,
+        first_edge: np.ndarray,
+        edge_patterns: np.ndarray,
+        edge_children: np.ndarray,
+        stat: str,
+        digest: str,
+    ) -> None:
+        self.guesses = guesses
+        self.first_edge = first_edge
+        self.edge_patterns = edge_patterns
+        self.edge_children = edge_children
+        self.stat = stat
+        self.digest = digest
+
+    def child(self, node: int, pattern: int) -> Optional[int]:
+        "Returns the node following the node after the feedback pattern"
+        start, end = self.first_edge[node], self.first_edge[node + 1]
+        i = start + np.searchsorted(self.edge_patterns[start:end], pattern)
+        if i < end and self.edge_patterns[i] == pattern:
+            return int(self.edge_children[i])
+        return None
+
+    def save(self, path: str) -> None:
+        "Writes the tree to the binary file"
+        header = struct.pack(
+            header_format,
+            magic,
+            version,
+            len(self.guesses),
+            len(self.edge_patterns),
+            self.stat.encode("ascii"),
+            self.digest.encode("ascii"),
+        )
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "wb") as f:
+            f.write(header.ljust(header_size, b"\0"))
+            for array in (self.guesses, self.first_edge, self.edge_children):
+                f.write(array.astype("<u4").tobytes())
+            f.write(self.edge_patterns.astype("<u2").tobytes())
+        os.replace(temporary_path, path)
+
+    @staticmethod
+    def load(path: str) -> "DecisionTree":
+        "Memory-maps the tree from the binary file"
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        file_magic, file_version, nodes, edges, stat, digest = struct.unpack_from(
+            header_format, buffer
+        )
+        if file_magic != magic or file_version != version:
+            raise ValueError(f"{path} is not a decision tree file.")
+        offset = header_size
+        arrays = []
+        for count, dtype in ((nodes, "<u4"), (nodes + 1, "<u4"), (edges, "<u4")):
+            arrays.append(np.frombuffer(buffer, dtype, count, offset))
+            offset += 4 * count
+        guesses, first_edge, edge_children = arrays
+        edge_patterns = np.frombuffer(buffer, "<u2", edges, offset)
+        return DecisionTree(
+            guesses,
+            first_edge,
+            edge_patterns,
+            edge_children,
+            stat.rstrip(b"\0").decode("ascii"),
+            digest.decode("ascii"),
+        )
+
+
+@profiled("decisiontree.build_tree")
+def build_tree(vocabulary: Vocabulary, patterns: np.ndarray, stat: str) -> DecisionTree:
+    """
+    Walks the whole game tree of the cutting algorithm breadth first:
+    in each node makes the guess the algorithm makes for the words left
+    and creates a child for each feedback pattern except the solved one.
+    """
+    statistics = {stat: supported_statistics[stat]}
+    patterns_count = number_of_patterns(vocabulary.length)
+    solved = solved_pattern(vocabulary.length)
+    guesses, first_edge, edge_patterns, edge_children = [], [0], [], []
+    queue = deque([np.arange(len(vocabulary))])
+    while queue:
+        candidates = queue.popleft()
+        values = pattern_statistics(
+            patterns, candidates, candidates, statistics, patterns_count
+        )[stat]
+        best = values.argmin()
+        guesses.append(candidates[best])
+        feedback = patterns[candidates[best], candidates]
+        for pattern in np.unique(feedback):
+            if pattern == solved:
+                continue
+            edge_patterns.append(pattern)
+            edge_children.append(len(guesses) + len(queue))
+            queue.append(candidates[feedback == pattern])
+        first_edge.append(len(edge_patterns))
+    return DecisionTree(
+        np.array(guesses),
+        np.array(first_edge),
+        np.array(edge_patterns, dtype=np.uint16),
+        np.array(edge_children),
+        stat,
+        vocabulary.digest,
+    )
+
+
+def tree_path(vocabulary: Vocabulary, stat: str) -> str:
+    "Path of the cached decision tree of the vocabulary."
+    name = f"tree-{vocabulary.digest[:16]}-{stat}-v{version}.bin"
+    return os.path.join(cache_directory, name)
+
+
+class DecisionTreeAlgorithm(WordleAlgorithm):
+    """
+    The cutting algorithm playing by the decision tree solved in advance:
+    the guess is looked up by the sequence of feedback patterns, or by the words
+    left if the information does not keep the guesses. Falls back
+    to live computation if the game left the tree, e.g. if some guesses
+    were not made by the algorithm.
+    """
+
+    def __init__(
+        self,
+        possible_words: Union["pd.DataFrame", Vocabulary],
+        stat: str = "mean",
+        path: str = None,
+    ) -> None:
+        if stat not in supported_statistics:
+            raise ValueError(f"Not supported statistic: {stat}")
+        super().__init__(possible_words)
+        self.stat = stat
+        if path is None:
+            path = tree_path(self.vocabulary, stat)
+            if not os.path.exists(path):
+                os.makedirs(cache_directory, exist_ok=True)
+                patterns = load_pattern_matrix(self.vocabulary)
+                build_tree(self.vocabulary, patterns, stat).save(path)
+        self.tree = DecisionTree.load(path)
+        if self.tree.digest != self.vocabulary.digest or self.tree.stat != stat:
+            raise ValueError(f"The tree {path} was built for another game.")
+        self.fallback: Optional[CuttingAlgorithm] = None
+
+    def live_algorithm(self) -> CuttingAlgorithm:
+        "Cutting algorithm to use for positions not covered by the tree"
+        if self.fallback is None:
+            self.fallback = CuttingAlgorithm(self.vocabulary, self.stat)
+        return self.fallback
+
+    def lookup(self, info: Information) -> Optional[str]:
+        """
+        Follows the tree by the guesses made so far and returns the guess
+        of the node reached or None if the guesses are not in the tree.
+        Information without the guesses, e.g. a compiled constraint
+        or rejected letters without positions, is looked up by the words left.
+        """
+        length = self.vocabulary.length
+        if isinstance(info, Constraint) or len(info) % length:
+            return self.lookup_candidates(info)
+        node = 0
+        for start in range(0, len(info), length):
+            letters = info[start : start + length]
+            if [l.position for l in letters] != list(range(1, length + 1)):
+                return self.lookup_candidates(info)
+            guess = "".join(l.letter for l in letters)
+            if guess != self.vocabulary.words[self.tree.guesses[node]]:
+                return None
+            node = self.tree.child(node, pattern_of_letters(letters))
+            if node is None:
+                return None
+        return self.vocabulary.words[self.tree.guesses[node]]
+
+    def lookup_candidates(self, info: Information) -> Optional[str]:
+        """
+        Follows the tree by the feedback its guesses give for a word still
+        possible, which is the same for all of them if the guess was made,
+        narrowing the words of the node down. Returns the guess of the node
+        the words of which are the ones still possible, or None if some
+        of them are out of the words of the node.
+        """
+        candidates = self.update(info)
+        if len(candidates) == 0:
+            return None
+        codes, presence = self.vocabulary.codes, self.vocabulary.presence
+        words = np.arange(len(self.vocabulary))
+        node = 0
+        while node is not None and np.isin(candidates, words).all():
+            guess = self.tree.guesses[node]
+            if len(words) == len(candidates):
+                return self.vocabulary.words[guess]
+            feedback = compute_patterns(codes[[guess]], codes[words], presence[words])[
+                0
+            ]
+            pattern = feedback[np.searchsorted(words, candidates[0])]
+            words = words[feedback == pattern]
+            node = self.tree.child(node, int(pattern))
+        return None
+
+    def guess(self, info: Information) -> str:
+        "Looks the guess up in the tree"
+        guess = self.lookup(info)
+        if guess is None:
+            return self.live_algorithm().guess(info)
+        return guess
+
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
+        "The tree keeps the best guess only, so all guesses are ranked live"
+        self.update(info)
+        return self.live_algorithm().rank_guesses(info)
+
+    def top_guesses(self, info: Information, k: int) -> "pd.DataFrame":
+        self.update(info)
+        return self.live_algorithm().top_guesses(info, k)
+
+
+def main():
+    args = parse_args()
+    profiler = enable() if args.profile is not None else None
+    vocabulary = load_vocabulary(args.t)
+    path = args.out if args.out is not None else tree_path(vocabulary, args.stat)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tree = build_tree(vocabulary, load_pattern_matrix(vocabulary), args.stat)
+    tree.save(path)
+    print(f"Saved the tree of {len(tree.guesses)} nodes to {path}.")
+    if profiler is not None:
+        profiler.end_turn()
+        profiler.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+import csv
+import mmap
+import os
+import struct
+from argparse import ArgumentParser, Namespace
+from typing import List
+
+import numpy as np
+
+from vocabulary import Vocabulary, russian_alphabet
+from profiling import profiled, enable
+
+# magic, version, word length, alphabet size, number of words, checksum
+header_format = "<8sIIIQ32s"
+header_size = 64
+magic = b"WRDLDICT"
+version = 1
+
+
+class DictionaryError(ValueError):
+    """Raised when a compiled dictionary is broken"""
+
+    pass
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to the table with all possible words",
+    )
+    parser.add_argument(
+        "--out",
+        default="./five_letter_words.dict",
+        help="path to the compiled dictionary",
+    )
+    parser.add_argument(
+        "--alphabet",
+        default=russian_alphabet,
+        help="letters of the words in the table",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages of compiling to",
+    )
+    return parser.parse_args()
+
+
+def is_compiled_dictionary(path: str) -> bool:
+    "Checks whether the file is a compiled dictionary."
+    with open(path, "rb") as f:
+        return f.read(len(magic)) == magic
+
+
+def read_words(path: str) -> List[str]:
+    "Reads words from the table of words in cp1251 encoding."
+    with open(path, encoding="cp1251", newline="") as f:
+        return [row["word"] for row in csv.DictReader(f)]
+
+
+@profiled("dictionary.compile_dictionary")
+def compile_dictionary(vocabulary: Vocabulary, path: str) -> None:
+    """
+    Writes the vocabulary to the binary file: the header with the word length,
+    the alphabet and the checksum of the letter codes is followed by the codes.
+    """
+    length = vocabulary.length
+    header = struct.pack(
+        header_format,
+        magic,
+        version,
+        length,
+        len(vocabulary.alphabet),
+        len(vocabulary),
+        bytes.fromhex(vocabulary.digest),
+    )
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, "wb") as f:
+        f.write(header.ljust(header_size, b"\0"))
+        f.write(vocabulary.alphabet.encode("utf-32-le"))
+        f.write(np.ascontiguousarray(vocabulary.codes, dtype=np.uint8).tobytes())
+    os.replace(temporary_path, path)
+
+
+def load_dictionary(path: str, verify: bool = True) -> Vocabulary:
+    """
+    Memory-maps the compiled dictionary. Letter codes are used by the vocabulary
+    without copying, words are decoded on demand.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    file_magic, file_version, length, alphabet_size, count, checksum = (
+        struct.unpack_from(header_format, buffer)
+    )
+    if file_magic != magic or file_version != version:
+        raise DictionaryError(f"{path} is not a compiled dictionary.")
+    offset = header_size + 4 * alphabet_size
+    alphabet = buffer[header_size:offset].decode("utf-32-le")
+    codes = np.frombuffer(buffer, np.uint8, count * length, offset)
+    vocabulary = Vocabulary(codes.reshape(count, length), alphabet)
+    if verify and bytes.fromhex(vocabulary.digest) != checksum:
+        raise DictionaryError(f"Checksum of the dictionary {path} does not match.")
+    return vocabulary
+
+
+@profiled("dictionary.load_vocabulary")
+def load_vocabulary(path: str, alphabet: str = russian_alphabet) -> Vocabulary:
+    """
+    Loads the vocabulary either from a compiled dictionary or from a table of words.
+    A compiled dictionary keeps the length of words and the alphabet, the length
+    of words in a table is taken from the words, the alphabet from the argument.
+    """
+    if is_compiled_dictionary(path):
+        return load_dictionary(path)
+    return Vocabulary.from_words(read_words(path), alphabet)
+
+
+def main():
+    args = parse_args()
+    profiler = enable() if args.profile is not None else None
+    vocabulary = load_vocabulary(args.t, args.alphabet)
+    compile_dictionary(vocabulary, args.out)
+    print(
+        f"Compiled {len(vocabulary)} words of {vocabulary.length} letters to {args.out}."
+    )
+    if profiler is not None:
+        profiler.end_turn()
+        profiler.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
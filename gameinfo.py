@@ -1,41 +1,70 @@
 from abc import abstractmethod, ABC
-from typing import List
+from collections import Counter
+from typing import Dict, List, Tuple, Union, TYPE_CHECKING
 
 from termcolor import colored
-import pandas as pd
+import numpy as np
+
+from vocabulary import russian_alphabet, word_length, encode_words, presence_masks
+from profiling import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class InputError(ValueError):
     pass
 
 
-def load_possible_words(path: str) -> pd.DataFrame:
-    "Loads table of all possible five letter words."
+@profiled("gameinfo.load_possible_words")
+def load_possible_words(path: str) -> "pd.DataFrame":
+    "Loads table of all possible words."
+    import pandas as pd
+    from dictionary import is_compiled_dictionary, load_dictionary
+
+    if is_compiled_dictionary(path):
+        return pd.DataFrame({"word": load_dictionary(path).words})
     return pd.read_csv(path, encoding="cp1251")
 
 
 class Letter(ABC):
     """
     Abstract class for information about presence of a letter in the word.
+    The letter is coded by its index in the alphabet of the game.
     """
 
-    russian_alphabet = "абвгдежзийклмнопрстуфхшщчцьыъэюя"
-
-    def __init__(self, letter: str, position: int = 0) -> None:
+    def __init__(
+        self, letter: str, position: int = 0, alphabet: str = russian_alphabet
+    ) -> None:
         letter = letter.lower()
-        if letter not in Letter.russian_alphabet:
+        if len(letter) != 1 or letter not in alphabet:
             wrong_letter = colored(letter, "red")
+            if alphabet == russian_alphabet:
+                raise InputError(
+                    f'The letter should be from russian alphabet excluding letter "ё". Ypu typed in "{wrong_letter}".'
+                )
             raise InputError(
-                f'The letter should be from russian alphabet excluding letter "ё". Ypu typed in "{wrong_letter}".'
+                f'The letter should be from the alphabet "{alphabet}". You typed in "{wrong_letter}".'
             )
         self.letter = letter
         self.position = position
+        self.code = alphabet.index(letter)
+
+    @property
+    def bit(self) -> int:
+        "Bit of the letter in bitmasks of letters"
+        return 1 << self.code
 
     @abstractmethod
     def filter(self, word: str) -> bool:
         "Checks whether the word satisfies the information about the letter."
         pass
 
+    @abstractmethod
+    def restrict(self, constraint: "Constraint") -> None:
+        "Adds the information about the letter to the constraint."
+        pass
+
     @abstractmethod
     def __str__(self) -> str:
         "Color code the letter"
@@ -72,6 +101,11 @@ class RejectedLetter(Letter):
             return False
         return True
 
+    def restrict(self, constraint: "Constraint") -> None:
+        constraint.rejected |= self.bit
+        if self.position:
+            constraint.allowed[self.position - 1] &= ~self.bit
+
     def __str__(self) -> str:
         return self.letter.upper()
 
@@ -99,6 +133,10 @@ class AcceptedLetterWrongPosition(Letter):
             return False
         return True
 
+    def restrict(self, constraint: "Constraint") -> None:
+        constraint.present |= self.bit
+        constraint.allowed[self.position - 1] &= ~self.bit
+
     def description(self) -> str:
         colored_letter = colored(self.letter, "yellow")
         colored_position = colored(self.position, "yellow")
@@ -124,6 +162,10 @@ class AcceptedLetterCorrectPosition(Letter):
             return False
         return True
 
+    def restrict(self, constraint: "Constraint") -> None:
+        constraint.present |= self.bit
+        constraint.allowed[self.position - 1] &= self.bit
+
     def description(self) -> str:
         colored_letter = colored(self.letter, "green")
         colored_position = colored(self.position, "green")
@@ -134,9 +176,14 @@ class AcceptedLetterCorrectPosition(Letter):
         return True if word[position] == letter else False
 
 
-def classify_letter(letter: str, position: int, correct_word: str) -> Letter:
+@profiled("gameinfo.classify_letter")
+def classify_letter(
+    letter: str, position: int, correct_word: str, alphabet: str = russian_alphabet
+) -> Letter:
     """
     Classifies the letter to one of three types and returns an instance of correct class.
+    Other letters of the guess are not taken into account, so letters of guesses
+    with repeated letters are classified by classify_guess.
     """
     for letter_type in (
         RejectedLetter,
@@ -144,14 +191,219 @@ def classify_letter(letter: str, position: int, correct_word: str) -> Letter:
         AcceptedLetterCorrectPosition,
     ):
         if letter_type.classify(letter, position, correct_word):
-            return letter_type(letter, position + 1)
+            return letter_type(letter, position + 1, alphabet)
+
+
+@profiled("gameinfo.classify_guess")
+def classify_guess(
+    guess: str, correct_word: str, alphabet: str = russian_alphabet
+) -> List[Letter]:
+    """
+    Classifies all the letters of the guess. A repeated letter is accepted
+    as many times as it is met in the correct word: at correct positions first,
+    then from left to right, the other occurrences are rejected.
+    """
+    left = Counter(c for g, c in zip(guess, correct_word) if g != c)
+    letters: List[Letter] = []
+    for position, (letter, correct) in enumerate(zip(guess, correct_word)):
+        if letter == correct:
+            letters.append(
+                AcceptedLetterCorrectPosition(letter, position + 1, alphabet)
+            )
+        elif left[letter] > 0:
+            left[letter] -= 1
+            letters.append(AcceptedLetterWrongPosition(letter, position + 1, alphabet))
+        else:
+            letters.append(RejectedLetter(letter, position + 1, alphabet))
+    return letters
+
+
+def split_guesses(letters: List[Letter]) -> List[List[Letter]]:
+    """
+    Splits letters into guesses: a guess ends before a letter
+    at a position already met in it. Rejected letters typed in without
+    a position never start a new guess.
+    """
+    guesses: List[List[Letter]] = []
+    positions = set()
+    for letter in letters:
+        if not guesses or (letter.position and letter.position in positions):
+            guesses.append([])
+            positions = set()
+        guesses[-1].append(letter)
+        positions.add(letter.position)
+    return guesses
+
+
+class Constraint:
+    """
+    Information about the word compiled from any number of letters:
+    bitmasks of letters allowed at each position, of letters present
+    in the word and of letters rejected, and the least numbers of times
+    letters are met. Repeated letters do not change it, so checking words
+    costs the same however long the game is.
+
+    Letters are merged guess by guess. A letter accepted several times
+    in a guess is met in the word at least as many times. If it is also
+    rejected in the same guess, e.g. the second "о" when the word has only one,
+    it is met exactly as many times.
+    """
+
+    def __init__(
+        self, length: int = word_length, alphabet_size: int = len(russian_alphabet)
+    ) -> None:
+        self.alphabet_size = alphabet_size
+        self.allowed = [(1 << alphabet_size) - 1] * length
+        self.present = 0
+        self.rejected = 0
+        self.counts: Dict[int, int] = {}
+        self.exact = 0
+
+    @staticmethod
+    def from_letters(
+        letters: List[Letter],
+        length: int = word_length,
+        alphabet_size: int = len(russian_alphabet),
+    ) -> "Constraint":
+        return Constraint(length, alphabet_size).update(letters)
+
+    def update(self, letters: List[Letter]) -> "Constraint":
+        "Merges the letters into the constraint guess by guess"
+        for guess in split_guesses(letters):
+            self.merge_guess(guess)
+        return self
+
+    def merge_guess(self, letters: List[Letter]) -> None:
+        "Merges the letters of a single guess"
+        accepted: Dict[int, int] = {}
+        rejected = 0
+        for letter in letters:
+            letter.restrict(self)
+            if isinstance(letter, RejectedLetter):
+                rejected |= letter.bit
+            else:
+                accepted[letter.code] = accepted.get(letter.code, 0) + 1
+        for code, count in accepted.items():
+            if count > self.counts.get(code, 0):
+                self.counts[code] = count
+            if rejected >> code & 1:
+                self.exact |= 1 << code
+
+    def copy(self) -> "Constraint":
+        constraint = Constraint(len(self.allowed), self.alphabet_size)
+        constraint.allowed = list(self.allowed)
+        constraint.present = self.present
+        constraint.rejected = self.rejected
+        constraint.counts = dict(self.counts)
+        constraint.exact = self.exact
+        return constraint
+
+    def key(self) -> Tuple:
+        "Canonical form of the constraint"
+        return (
+            tuple(self.allowed),
+            self.present,
+            self.rejected,
+            tuple(sorted(self.minimum_counts().items())),
+            self.exact,
+        )
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Constraint):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self) -> int:
+        return hash(self.key())
+
+    def implies(self, other: "Constraint") -> bool:
+        "Checks whether the constraint contains all the information of the other"
+        return (
+            len(self.allowed) == len(other.allowed)
+            and all(a & ~b == 0 for a, b in zip(self.allowed, other.allowed))
+            and self.present & other.present == other.present
+            and self.rejected & other.rejected == other.rejected
+            and self.exact & other.exact == other.exact
+            and all(
+                self.minimum_counts().get(code, 0) >= count
+                for code, count in other.minimum_counts().items()
+            )
+        )
+
+    def fixed_letters(self) -> Dict[int, int]:
+        "Codes of letters known at positions"
+        return {
+            position: allowed.bit_length() - 1
+            for position, allowed in enumerate(self.allowed)
+            if allowed and allowed & (allowed - 1) == 0
+        }
+
+    def minimum_counts(self) -> Dict[int, int]:
+        """
+        Least number of times each of present letters is in the word:
+        the most times it is accepted in a guess or known at positions.
+        """
+        fixed: Dict[int, int] = {}
+        for code in self.fixed_letters().values():
+            fixed[code] = fixed.get(code, 0) + 1
+        counts = dict(self.counts)
+        for code, count in fixed.items():
+            counts[code] = max(count, counts.get(code, 0))
+        return counts
+
+    @profiled("gameinfo.constraint_mask")
+    def mask(self, codes: np.ndarray, presence: np.ndarray) -> np.ndarray:
+        """
+        Checks which of encoded words satisfy the constraint.
+        Takes the array of letter codes and bitmasks of present letters.
+        """
+        mask = np.ones(len(codes), dtype=bool)
+        full = (1 << self.alphabet_size) - 1
+        letters = np.arange(self.alphabet_size)
+        for position, allowed in enumerate(self.allowed):
+            if allowed != full:
+                table = (allowed >> letters & 1).astype(bool)
+                mask &= table[codes[:, position]]
+        if self.present:
+            present = presence.dtype.type(self.present)
+            mask &= (presence & present) == present
+        absent = self.rejected & ~self.present
+        if absent:
+            mask &= (presence & presence.dtype.type(absent)) == 0
+        for code, count in self.minimum_counts().items():
+            if self.exact >> code & 1:
+                mask &= (codes == code).sum(axis=1) == count
+            elif count > 1:
+                mask &= (codes == code).sum(axis=1) >= count
+        return mask
+
+
+# information gained in a game: letters in the order of guesses or a compiled constraint
+Information = Union[List[Letter], Constraint]
+
+
+def mask_of_possible_words(
+    info: Information, codes: np.ndarray, presence: np.ndarray
+) -> np.ndarray:
+    """
+    Computes boolean mask of encoded words satisfying the information
+    given either as letters or as a constraint compiled from them.
+    """
+    if not isinstance(info, Constraint):
+        alphabet_size = 8 * presence.dtype.itemsize
+        info = Constraint.from_letters(info, codes.shape[1], alphabet_size)
+    return info.mask(codes, presence)
 
 
-def filter_impossible_words(words: pd.DataFrame, info: List[Letter]) -> pd.DataFrame:
+@profiled("gameinfo.filter_impossible_words")
+def filter_impossible_words(
+    words: "pd.DataFrame", info: Information, alphabet: str = russian_alphabet
+) -> "pd.DataFrame":
     """
-    Filters impossible words from the table according to the information in all letters
+    Filters impossible words from the table according to the information
     """
-    for letter in info:
-        mask = words["word"].map(letter.filter)
-        words = words[mask]
-    return words
+    if not info:
+        return words
+    codes = encode_words(words["word"].to_numpy(), alphabet)
+    presence = presence_masks(codes, len(alphabet))
+    return words[mask_of_possible_words(info, codes, presence)]
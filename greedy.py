@@ -1,14 +1,17 @@
-from functools import partial
-from sqlite3 import adapt
-from typing import List
+from typing import Tuple, Union, TYPE_CHECKING
 from argparse import ArgumentParser, Namespace
-from collections import Counter
 
-import pandas as pd
+import numpy as np
 
-from gameinfo import Letter, filter_impossible_words, load_possible_words
-from wordlealgorithm import WordleAlgorithm
+from gameinfo import Information
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary, russian_alphabet, encode_words, letter_count_matrix
+from wordlealgorithm import WordleAlgorithm, cached, top_indices
 from interaction import interact
+from profiling import profiled, enable
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def parse_args() -> Namespace:
@@ -27,38 +30,37 @@ def parse_args() -> Namespace:
     parser.add_argument(
         "--n", type=int, default=15, help="number of words to show on each iteration"
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages per turn and per game to",
+    )
     return parser.parse_args()
 
 
-def add_frequency_column(words: pd.DataFrame) -> pd.DataFrame:
+@profiled("greedy.add_frequency_column")
+def add_frequency_column(
+    words: "pd.DataFrame", alphabet: str = russian_alphabet
+) -> "pd.DataFrame":
     """
     for each word in the table computes total frequency of letters
     and adds corresponding column to the table
     """
-    letter_frequencies = compute_frequencies_of_letters(words["word"])
-    f = partial(total_frequency_of_word, letter_frequencies=letter_frequencies)
-    words["frequency"] = words["word"].map(f)
+    codes = encode_words(words["word"].to_numpy(), alphabet)
+    counts = letter_count_matrix(codes, len(alphabet))
+    letter_frequencies = compute_frequencies_of_letters(counts.sum(axis=0))
+    words["frequency"] = (counts > 0) @ letter_frequencies
     return words.sort_values("frequency", ascending=False)
 
 
-def total_frequency_of_word(word: str, letter_frequencies: pd.Series) -> float:
+def compute_frequencies_of_letters(letter_totals: np.ndarray) -> np.ndarray:
     """
-    computes total frequency of letters in the word
+    computes frequencies of each letter given the numbers of times
+    each letter is met in the table of words
     """
-    unique_letters = set(word)
-    return sum(letter_frequencies.loc[letter] for letter in unique_letters)
-
-
-def compute_frequencies_of_letters(words: pd.Series) -> pd.Series:
-    """
-    computes frequencies of each letter in the table of words
-    and returns this as pandas.Series
-    """
-    letter_counter = Counter()
-    for word in words:
-        letter_counter.update(word)
-    letter_frequencies = pd.Series(letter_counter)
-    return letter_frequencies / letter_frequencies.sum()
+    return letter_totals / letter_totals.sum()
 
 
 class GreedyAlgorithm(WordleAlgorithm):
@@ -68,40 +70,92 @@ class GreedyAlgorithm(WordleAlgorithm):
     the better the guess. Frequency of a letter is computed based on the
     table of all possible five letter words. Algorithm can work in adap-
     tive mode in which it recompute letter frequencies each time a new
-    information has come.
+    information has come: numbers of letters are updated by subtracting
+    the words eliminated.
     """
 
-    def __init__(self, possible_words: pd.DataFrame, adapt: bool = True) -> None:
-        super().__init__(add_frequency_column(possible_words.copy()))
+    def __init__(
+        self, possible_words: Union["pd.DataFrame", Vocabulary], adapt: bool = True
+    ) -> None:
+        super().__init__(possible_words)
         self.adapt = adapt
+        self.initial_frequencies = compute_frequencies_of_letters(self.letter_totals)
+
+    def reset(self) -> None:
+        super().reset()
+        self.letter_totals = self.vocabulary.letter_counts.sum(axis=0)
+
+    def eliminate(self, eliminated: np.ndarray) -> None:
+        self.letter_totals -= self.vocabulary.letter_counts[eliminated].sum(axis=0)
 
-    def rank_guesses(self, info: List[Letter]) -> pd.DataFrame:
+    def fork(self) -> "GreedyAlgorithm":
+        fork = super().fork()
+        fork.letter_totals = self.letter_totals.copy()
+        return fork
+
+    def total_frequencies(self) -> np.ndarray:
+        "computes total frequencies of letters of all the possible words"
+        if self.adapt:
+            letter_frequencies = compute_frequencies_of_letters(self.letter_totals)
+        else:
+            letter_frequencies = self.initial_frequencies
+        return self.vocabulary.letter_presence[self.candidates] @ letter_frequencies
+
+    def cache_key(self) -> Tuple:
+        return super().cache_key() + (self.adapt,)
+
+    @profiled("greedy.rank_guesses")
+    @cached
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
         """
         ranks all possible words on the basis of total frequencies of
         letters in a words and return it in the form of table.
         """
-        words = filter_impossible_words(self.possible_words, info)
-        if self.adapt:
-            words = add_frequency_column(words)
-        self.possible_words = words.sort_values("frequency", ascending=False)
-        return self.possible_words
-
-    def guess(self, info: List[Letter]) -> str:
+        self.update(info)
+        frequencies = self.total_frequencies()
+        order = np.argsort(-frequencies, kind="stable")
+        words = self.all_words.iloc[self.candidates[order]].copy()
+        words["frequency"] = frequencies[order]
+        return words
+
+    def select(self, info: Information, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        selects k words with biggest total frequencies of letters, returns
+        their indices in the vocabulary and their frequencies.
+        """
+        self.update(info)
+        frequencies = self.total_frequencies()
+        best = top_indices(-frequencies, k)
+        return self.candidates[best], frequencies[best]
+
+    @profiled("greedy.top_guesses")
+    @cached
+    def top_guesses(self, info: Information, k: int) -> "pd.DataFrame":
+        "ranks only k words with biggest total frequencies of letters."
+        indices, frequencies = self.select(info, k)
+        words = self.all_words.iloc[indices].copy()
+        words["frequency"] = frequencies
+        return words
+
+    @profiled("greedy.guess")
+    @cached
+    def guess(self, info: Information) -> str:
         """
         computes and returns the word with biggest total frequencies of
         letters.
         """
-        self.possible_words = filter_impossible_words(self.possible_words, info)
-        if self.adapt:
-            self.possible_words = add_frequency_column(self.possible_words)
-        return self.possible_words["word"].iloc[0]
+        indices, _ = self.select(info, 1)
+        return self.vocabulary.word(indices[0])
 
 
 def main():
     args = parse_args()
-    possible_words = load_possible_words(path=args.t)
-    guesser = GreedyAlgorithm(possible_words=possible_words, adapt=adapt)
+    profiler = enable() if args.profile is not None else None
+    possible_words = load_vocabulary(path=args.t)
+    guesser = GreedyAlgorithm(possible_words=possible_words, adapt=args.adapt)
     interact(guesser, words_to_show=args.n)
+    if profiler is not None:
+        profiler.save(args.profile)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+import json
+import subprocess
+import sys
+from argparse import ArgumentParser, Namespace
+from statistics import median
+from typing import Dict, List
+
+core_modules = ["gameinfo", "wordlealgorithm", "wordle", "greedy", "biggest_cut"]
+heavy_modules = ["pandas", "tqdm"]
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--modules",
+        nargs="+",
+        default=core_modules,
+        help="modules to measure import time of",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="number of measurements per module"
+    )
+    parser.add_argument(
+        "--out", default=None, help="path to the JSON file, printed if not specified"
+    )
+    return parser.parse_args()
+
+
+def measure_import(module: str) -> Dict:
+    """
+    Imports the module in a fresh interpreter with -X importtime and returns
+    total import time in microseconds and heavy modules imported along the way.
+    """
+    check = f"import sys, {module}; print(*[m in sys.modules for m in {heavy_modules}])"
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total = 0
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        # top level imports are not indented
+        if not name.startswith("  "):
+            total += int(cumulative)
+    imported = process.stdout.split()
+    return {
+        "microseconds": total,
+        "imports": [m for m, flag in zip(heavy_modules, imported) if flag == "True"],
+    }
+
+
+def measure(modules: List[str], repeat: int) -> Dict:
+    "Median import time of each module over several fresh interpreters."
+    report = {}
+    for module in modules:
+        measurements = [measure_import(module) for _ in range(repeat)]
+        report[module] = {
+            "microseconds": median(m["microseconds"] for m in measurements),
+            "imports": measurements[0]["imports"],
+        }
+    return report
+
+
+def main():
+    args = parse_args()
+    report = measure(args.modules, args.repeat)
+    text = json.dumps(report, indent=1)
+    if args.out is None:
+        print(text)
+    else:
+        with open(args.out, "w") as f:
+            f.write(text)
+
+
+if __name__ == "__main__":
+    main()
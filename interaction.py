@@ -1,24 +1,114 @@
-from typing import Optional, List
+import json
+import sys
+from argparse import ArgumentParser, Namespace
+from collections import deque
+from threading import Event, Thread
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from time import perf_counter
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple, TYPE_CHECKING
 
-from wordlealgorithm import WordleAlgorithm
+import numpy as np
+
+from wordlealgorithm import WordleAlgorithm, make_algorithm, supported_algorithms
+from vocabulary import russian_alphabet, word_length
+from patterns import compute_patterns
+from profiling import enable, stage, start_turn, end_turn
 from gameinfo import (
     Letter,
     RejectedLetter,
     AcceptedLetterWrongPosition,
     AcceptedLetterCorrectPosition,
     InputError,
+    Constraint,
+    classify_guess,
 )
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# the algorithm replaying sessions in a worker process
+replay_algorithm: Optional[WordleAlgorithm] = None
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser(
+        description="Replays sessions of feedback lines read as JSONL and writes "
+        "top guesses for every step as JSONL."
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        default=["-"],
+        help="files with a session per line, standard input if not specified",
+    )
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument(
+        "--algorithm",
+        default="cutting",
+        choices=[name for name in supported_algorithms if name != "manual"],
+        help="algorithm to rank guesses with",
+    )
+    parser.add_argument(
+        "--stat",
+        default=None,
+        help="statistic of the algorithm, the default one if not specified",
+    )
+    parser.add_argument(
+        "--n", type=int, default=15, help="number of words to output on each step"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of worker processes"
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help="path to the output file, standard output if not specified",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="add time of stages of each step to its record",
+    )
+    args = parser.parse_args()
+    if args.stat is not None:
+        if args.algorithm == "greedy":
+            parser.error("argument --stat: not supported by the greedy algorithm")
+        if args.algorithm == "lookahead":
+            from lookahead import supported_objectives as choices
+        else:
+            from biggest_cut import supported_statistics as choices
+        if args.stat not in choices:
+            parser.error(
+                f"argument --stat: invalid choice: '{args.stat}' "
+                f"(choose from {', '.join(choices)})"
+            )
+    return args
+
+
+@lru_cache(maxsize=None)
+def read_instruction() -> str:
+    """
+    Reads instruction to an user once.
+    """
+    with open("user_instruction.txt", encoding="cp1251") as f:
+        return f.read()
+
 
 def print_instruction() -> None:
     """
     Prints instruction to an user.
     """
-    with open("user_instruction.txt", encoding="cp1251") as f:
-        print(f.read())
+    print(read_instruction())
 
 
-def parse_letter(letter, code) -> Letter:
+def parse_letter(
+    letter, code, alphabet: str = russian_alphabet, length: int = word_length
+) -> Letter:
     """
     Parse a letter and a code and returns a Letter instance.
     If input is incorrect, raises an error
@@ -28,26 +118,38 @@ def parse_letter(letter, code) -> Letter:
     except ValueError:
         raise InputError("The code should be an integer.")
 
-    if code not in range(-5, 6):
-        raise InputError("The code should be in range from -5 tо 5.")
+    if code not in range(-length, length + 1):
+        raise InputError(f"The code should be in range from -{length} tо {length}.")
 
     # make an instance of Letter
     if code == 0:
-        return RejectedLetter(letter)
+        return RejectedLetter(letter, alphabet=alphabet)
     elif code > 0:
-        return AcceptedLetterCorrectPosition(letter, code)
+        return AcceptedLetterCorrectPosition(letter, code, alphabet)
     elif code < 0:
-        return AcceptedLetterWrongPosition(letter, -code)
+        return AcceptedLetterWrongPosition(letter, -code, alphabet)
     else:
         raise ValueError(f"Not supported code: {code}")
 
 
-def parse_info() -> Optional[List[Letter]]:
+def parse_info(
+    alphabet: str = russian_alphabet, length: int = word_length
+) -> Optional[List[Letter]]:
     """
     Parses the info an user typed in.
     Raises an error
     """
-    line = input().strip()
+    return parse_line(input(), alphabet, length)
+
+
+def parse_line(
+    line: str, alphabet: str = russian_alphabet, length: int = word_length
+) -> Optional[List[Letter]]:
+    """
+    Parses a line of letters and codes, returns None for an empty line.
+    Raises an error
+    """
+    line = line.strip()
     if line == "":
         return None
 
@@ -55,33 +157,295 @@ def parse_info() -> Optional[List[Letter]]:
     if len(tokens) % 2:
         raise InputError("The number of tokens should be even.")
     return [
-        parse_letter(letter, code) for letter, code in zip(tokens[::2], tokens[1::2])
+        parse_letter(letter, code, alphabet, length)
+        for letter, code in zip(tokens[::2], tokens[1::2])
     ]
 
 
-def interact(guesser: WordleAlgorithm, words_to_show: int) -> None:
+class Speculation:
+    """
+    Ranks guesses of the next turn in a background thread while the user
+    types in the feedback. Feedback patterns of the guess are tried in the order
+    of the number of words giving them, at most limit of them. Rankings are
+    computed by a fork of the algorithm and keyed by the words left, so they
+    are reused whatever the feedback is typed in as. The work is cancelled
+    between blocks of scoring as soon as the feedback arrives.
+    """
+
+    def __init__(
+        self,
+        guesser: WordleAlgorithm,
+        info: Constraint,
+        guess: str,
+        words_to_show: int,
+        limit: int,
+    ) -> None:
+        self.rankings: Dict[bytes, "pd.DataFrame"] = {}
+        self.cancelled = Event()
+        self.thread = Thread(
+            target=self.run,
+            args=(guesser.fork(), info.copy(), guess, words_to_show, limit),
+            daemon=True,
+        )
+        self.thread.start()
+
+    def run(
+        self,
+        guesser: WordleAlgorithm,
+        info: Constraint,
+        guess: str,
+        words_to_show: int,
+        limit: int,
+    ) -> None:
+        vocabulary = guesser.vocabulary
+        candidates = guesser.update(info)
+        index = vocabulary.index.find(guess)
+        patterns = compute_patterns(
+            vocabulary.codes[[index]],
+            vocabulary.codes[candidates],
+            vocabulary.presence[candidates],
+        )[0]
+        _, first, counts = np.unique(patterns, return_index=True, return_counts=True)
+        for bucket in np.argsort(-counts, kind="stable")[:limit]:
+            target = vocabulary.word(candidates[first[bucket]])
+            letters = classify_guess(guess, target, vocabulary.alphabet)
+            final = False
+            with stage("interaction.speculate"):
+                rankings = guesser.rank_progressively(
+                    info.copy().update(letters), words_to_show
+                )
+                for ranking, final in rankings:
+                    if self.cancelled.is_set():
+                        return
+            if final:
+                self.rankings[guesser.candidates.tobytes()] = ranking
+
+    def take(self, candidates: np.ndarray) -> Optional["pd.DataFrame"]:
+        "Cancels the work left and returns the ranking for the words if it is ready"
+        self.cancelled.set()
+        return self.rankings.get(candidates.tobytes())
+
+
+def interact(
+    guesser: WordleAlgorithm,
+    words_to_show: int,
+    time_limit: Optional[float] = None,
+    speculate: int = 0,
+) -> None:
     """
-    Runs interactive session.
+    Runs interactive session. A provisional ranking is shown as soon as
+    it is available, refining the ranking stops after the time limit.
+    If speculate is positive, rankings for that many most likely feedbacks
+    on the best guess are computed while the user types the feedback in.
     """
-    info: list[Letter] = []
+    vocabulary = guesser.vocabulary
+    info = Constraint(vocabulary.length, len(vocabulary.alphabet))
+    speculation: Optional[Speculation] = None
     while True:
+        start_turn()
         print("=" * 80)
-        ranked_guesses = guesser.rank_guesses(info)
-        print(
-            f"Here is top {words_to_show} most prominent words out of {len(guesser.possible_words)} possible."
-        )
-        print(ranked_guesses.head(words_to_show).to_string(index=False))
+        deadline = None if time_limit is None else perf_counter() + time_limit
+        with stage("interaction.rank"):
+            ranked_guesses, final = None, False
+            if speculation is not None:
+                ranked_guesses = speculation.take(guesser.update(info))
+                final = ranked_guesses is not None
+            if ranked_guesses is None:
+                rankings = guesser.rank_progressively(info, words_to_show, deadline)
+            else:
+                rankings = []
+            for i, (ranked_guesses, final) in enumerate(rankings):
+                if i == 0 and not final:
+                    with stage("interaction.render"):
+                        print(
+                            f"Provisional top {words_to_show} words, scoring the rest..."
+                        )
+                        print(ranked_guesses.to_string(index=False))
+        with stage("interaction.render"):
+            stopped = "" if final else " (scoring stopped at the time limit)"
+            print(
+                f"Here is top {words_to_show} most prominent words out of {len(guesser.candidates)} possible{stopped}."
+            )
+            print(ranked_guesses.to_string(index=False))
+        end_turn()
+        speculation = None
+        if speculate > 0 and len(ranked_guesses):
+            speculation = Speculation(
+                guesser, info, ranked_guesses["word"].iloc[0], words_to_show, speculate
+            )
         print_instruction()
         try:
-            letters = parse_info()
+            letters = parse_info(vocabulary.alphabet, vocabulary.length)
         except InputError as msg:
             print(msg)
             continue
         if letters is None:
+            if speculation is not None:
+                speculation.cancelled.set()
             break
 
         for l in letters:
             print(l.description())
-        info.extend(letters)
+        info.update(letters)
 
     print("Exit.")
+
+
+def to_json(value):
+    "Converts numpy scalars met in tables to plain Python values"
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value)} is not JSON serializable")
+
+
+def read_session(line: str) -> Tuple[object, Optional[List[str]], Optional[str]]:
+    """
+    Parses a session from a JSONL line: either an object with "feedback",
+    a list of lines in the letter/code syntax, and optional "id", or the list
+    itself. Returns the id, None if not specified, the feedback lines
+    and the error, the feedback is None if the line is not a session.
+    """
+    try:
+        session = json.loads(line)
+    except ValueError as error:
+        return None, None, f"Not a JSON line: {error}"
+    if isinstance(session, list):
+        session = {"feedback": session}
+    if not isinstance(session, dict):
+        return None, None, "A session should be a JSON object or a list."
+    feedback = session.get("feedback", [])
+    if not isinstance(feedback, list) or not all(
+        isinstance(line, str) for line in feedback
+    ):
+        return session.get("id"), None, '"feedback" should be a list of lines.'
+    return session.get("id"), feedback, None
+
+
+def read_sessions(
+    lines: Iterable[str],
+) -> Iterator[Tuple[int, object, Optional[List[str]], Optional[str]]]:
+    """
+    Reads sessions from JSONL lines, yields their numbers in the order
+    of lines with the ids, feedback lines and errors of read_session.
+    """
+    number = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        yield (number, *read_session(line))
+        number += 1
+
+
+def initialize_replay(path: str, name: str, options: Dict) -> None:
+    "Loads the words and makes the algorithm replaying sessions in the process."
+    from dictionary import load_vocabulary
+
+    global replay_algorithm
+    replay_algorithm = make_algorithm(name, load_vocabulary(path), **options)
+
+
+def replay_session(
+    number: int,
+    session_id,
+    feedback: Optional[List[str]],
+    error: Optional[str],
+    n: int,
+    profile: bool = False,
+) -> List[Dict]:
+    """
+    Ranks guesses before the first feedback line and after each of them.
+    A line failing to parse ends the session with the error, a session
+    that failed to be read is a single record with the error.
+    With profile each step is a turn and its summary is added to the record.
+    """
+    if error is not None:
+        return [{"number": number, "session": session_id, "step": 0, "error": error}]
+    guesser = replay_algorithm
+    vocabulary = guesser.vocabulary
+    info = Constraint(vocabulary.length, len(vocabulary.alphabet))
+    profiler = enable() if profile else None
+    steps = []
+    for step in range(len(feedback) + 1):
+        start_turn()
+        record = {"number": number, "session": session_id, "step": step}
+        if step > 0:
+            record["feedback"] = feedback[step - 1]
+            try:
+                letters = parse_line(
+                    feedback[step - 1], vocabulary.alphabet, vocabulary.length
+                )
+            except InputError as error:
+                record["error"] = str(error)
+                steps.append(record)
+                break
+            if letters:
+                info.update(letters)
+        ranking = guesser.top_guesses(info, n)
+        record["possible"] = len(guesser.candidates)
+        record["ranking"] = ranking.to_dict("records")
+        if profiler is not None:
+            record["profile"] = profiler.end_turn()
+        steps.append(record)
+    return steps
+
+
+def replay(
+    sessions: Iterable[Tuple[int, object, Optional[List[str]], Optional[str]]],
+    path: str,
+    name: str,
+    options: Dict,
+    n: int,
+    workers: int = 1,
+    profile: bool = False,
+) -> Iterator[Dict]:
+    """
+    Replays the sessions and yields records of their steps in the order
+    of the sessions. With several workers the sessions are replayed on a pool
+    of processes, at most a few sessions per worker are read ahead,
+    so the sessions are streamed rather than loaded at once.
+    """
+    if workers <= 1:
+        initialize_replay(path, name, options)
+        for session in sessions:
+            yield from replay_session(*session, n, profile)
+        return
+    with ProcessPoolExecutor(
+        workers, initializer=initialize_replay, initargs=(path, name, options)
+    ) as pool:
+        pending = deque()
+        for session in sessions:
+            pending.append(pool.submit(replay_session, *session, n, profile))
+            if len(pending) >= 4 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def read_lines(inputs: List[str]) -> Iterator[str]:
+    "Lines of the files one after another, - stands for the standard input"
+    for path in inputs:
+        if path == "-":
+            yield from sys.stdin
+        else:
+            with open(path, encoding="utf-8") as f:
+                yield from f
+
+
+def main():
+    args = parse_args()
+    options = {} if args.stat is None else {"stat": args.stat}
+    sessions = read_sessions(read_lines(args.inputs))
+    records = replay(
+        sessions, args.t, args.algorithm, options, args.n, args.workers, args.profile
+    )
+    out = sys.stdout if args.out is None else open(args.out, "w", encoding="utf-8")
+    try:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False, default=to_json) + "\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+from argparse import ArgumentParser, Namespace
+from time import perf_counter
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from gameinfo import Information
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary
+from patterns import pattern_histograms
+from biggest_cut import CuttingAlgorithm, supported_statistics
+from wordlealgorithm import cached
+from interaction import interact
+from profiling import profiled, enable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# how values of the parts a guess splits the candidates into are combined:
+# the average weighted by sizes of the parts (expectimax) or the worst part (minimax)
+supported_objectives: Dict[str, Callable[[np.ndarray, np.ndarray], float]] = {
+    "mean": lambda sizes, values: float((sizes * values).sum() / sizes.sum()),
+    "max": lambda sizes, values: float(values.max()),
+}
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--stat",
+        default="mean",
+        choices=supported_objectives.keys(),
+        help="statistic of words left after two guesses to minimize.",
+    )
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument(
+        "--n", type=int, default=15, help="number of words to show on each iteration"
+    )
+    parser.add_argument(
+        "--beam",
+        type=int,
+        default=20,
+        help="number of guesses searched at each level",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=1.0,
+        help="seconds to search for each move",
+    )
+    parser.add_argument(
+        "--speculate",
+        type=int,
+        default=0,
+        help="number of most likely feedbacks to rank the next turn for while the feedback is typed in",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages per turn and per game to",
+    )
+    return parser.parse_args()
+
+
+def partition(candidates: np.ndarray, feedback: np.ndarray) -> List[np.ndarray]:
+    """
+    Splits sorted candidates by the feedback patterns of a guess,
+    each of the parts stays sorted.
+    """
+    order = np.argsort(feedback, kind="stable")
+    boundaries = np.flatnonzero(np.diff(feedback[order])) + 1
+    return np.split(candidates[order], boundaries)
+
+
+class LookaheadAlgorithm(CuttingAlgorithm):
+    """
+    The cutting algorithm searching two guesses deep: a guess is valued
+    by the words left after the best second guess in each of the parts
+    it splits the candidates into. The parts are combined by the average
+    weighted by their sizes (mean) or by the worst of them (max).
+
+    Only the beam of guesses best by the cutting statistic is searched
+    at the first level, and the beam of guesses with most frequent letters
+    at the second one. Values of parts are kept in the transposition table
+    keyed by the words of the part. The search stops when the time budget
+    of the move is spent and the best guess searched so far is made.
+    """
+
+    def __init__(
+        self,
+        possible_words: Union["pd.DataFrame", Vocabulary],
+        stat: str = "mean",
+        beam: int = 20,
+        budget: float = 1.0,
+        table_size: int = 1 << 16,
+    ) -> None:
+        if stat not in supported_objectives:
+            raise ValueError(f"Not supported statistic for lookahead: {stat}")
+        super().__init__(possible_words, stat)
+        self.beam = beam
+        self.budget = budget
+        self.table_size = table_size
+        self.table: Dict[bytes, float] = {}
+
+    def cache_key(self) -> Tuple:
+        return super().cache_key() + (self.beam, self.budget)
+
+    def part_value(self, part: np.ndarray) -> float:
+        """
+        Words left in the part after the best of the beam of second guesses.
+        Looked up in the transposition table first.
+        """
+        if len(part) <= 2:
+            # guessing either of two words leaves one word whatever the answer
+            return 1.0
+        key = part.tobytes()
+        value = self.table.get(key)
+        if value is None:
+            guesses = part
+            if len(part) > self.beam:
+                guesses = part[self.letter_frequency_order(part)[: self.beam]]
+            patterns = self.patterns[np.ix_(guesses, part)]
+            histograms = pattern_histograms(patterns, self.patterns_count)
+            value = float(supported_statistics[self.stat](histograms).min())
+            if len(self.table) >= self.table_size:
+                self.table.clear()
+            self.table[key] = value
+        return value
+
+    def guess_value(self, guess: int, candidates: np.ndarray) -> float:
+        "Words left after the guess and the best second guess"
+        parts = partition(candidates, self.patterns[guess, candidates])
+        sizes = np.array([len(part) for part in parts])
+        values = np.array([self.part_value(part) for part in parts])
+        return supported_objectives[self.stat](sizes, values)
+
+    @profiled("lookahead.search")
+    def search(self, candidates: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Values the candidates as the first guess: one guess deep for all of them
+        and two guesses deep for the beam of the best ones until the time budget
+        is spent. Returns both values, not searched guesses are valued by infinity.
+        """
+        deadline = perf_counter() + self.budget
+        statistic = self.cut_statistics(candidates, [self.stat])[self.stat]
+        values = np.full(len(candidates), np.inf)
+        if len(candidates) <= 2:
+            return statistic, statistic.astype(float)
+        for i in np.argsort(statistic, kind="stable")[: self.beam]:
+            values[i] = self.guess_value(candidates[i], candidates)
+            if perf_counter() > deadline:
+                break
+        return statistic, values
+
+    @profiled("lookahead.rank_guesses")
+    @cached
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
+        """
+        Ranks all possible guesses by the words left after two guesses,
+        the guesses out of the search by the cutting statistic.
+        """
+        import pandas as pd
+
+        candidates = self.update(info)
+        statistic, values = self.search(candidates)
+        order = np.lexsort((statistic, values))
+        return pd.DataFrame(
+            {
+                "word": self.all_words["word"].to_numpy()[candidates[order]],
+                self.stat: statistic[order],
+                "lookahead": values[order],
+            }
+        )
+
+    def top_guesses(self, info: Information, k: int) -> "pd.DataFrame":
+        "The search values all the guesses, so all of them are ranked"
+        return self.rank_guesses(info).head(k)
+
+    def rank_progressively(
+        self, info: Information, n: int, deadline: Optional[float] = None
+    ) -> Iterator[Tuple["pd.DataFrame", bool]]:
+        """
+        Yields the rankings of the cutting algorithm first
+        and the ranking searched two guesses deep at last.
+        """
+        for ranking, _ in super().rank_progressively(info, n, deadline):
+            yield ranking, False
+        if deadline is None or perf_counter() < deadline:
+            yield self.rank_guesses(info).head(n), True
+
+    @profiled("lookahead.guess")
+    @cached
+    def guess(self, info: Information) -> str:
+        "Returns the guess leaving fewest words after two guesses"
+        candidates = self.update(info)
+        statistic, values = self.search(candidates)
+        best = np.lexsort((statistic, values))[0]
+        return self.vocabulary.word(candidates[best])
+
+
+def main():
+    args = parse_args()
+    profiler = enable() if args.profile is not None else None
+    words = load_vocabulary(args.t)
+    guesser = LookaheadAlgorithm(words, args.stat, args.beam, args.budget)
+    interact(guesser, args.n, speculate=args.speculate)
+    if profiler is not None:
+        profiler.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
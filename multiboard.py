@@ -0,0 +1,297 @@
+from random import sample
+from argparse import ArgumentParser, Namespace
+from typing import Iterator, List, Optional, Tuple, Union, TYPE_CHECKING
+
+import numpy as np
+
+from gameinfo import Letter, AcceptedLetterCorrectPosition
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary, russian_alphabet
+from wordlealgorithm import CandidateTracker
+from patterns import board_statistics
+from biggest_cut import CuttingAlgorithm, supported_statistics
+from wordle import GameState, IncorrectWord, clear_screen
+from profiling import profiled, enable, start_turn, end_turn
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--boards",
+        type=int,
+        default=None,
+        help="number of words to guess at once, 4 or the number of words if not specified",
+    )
+    parser.add_argument(
+        "--words",
+        nargs="*",
+        default=None,
+        help="words to guess, randomly chosen if not specified",
+    )
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument(
+        "--stat",
+        default="mean",
+        choices=supported_statistics.keys(),
+        help="statistic of words left on a board to minimize in total.",
+    )
+    parser.add_argument(
+        "--auto",
+        action="store_true",
+        help="the algorithm plays instead of the player",
+    )
+    parser.add_argument(
+        "--attempts",
+        type=int,
+        default=None,
+        help="number of guesses allowed, the number of boards plus 5 if not specified",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages per turn and per game to",
+    )
+    args = parser.parse_args()
+    if args.words:
+        if args.boards is not None and args.boards != len(args.words):
+            parser.error(
+                f"argument --boards: {args.boards} boards "
+                f"do not match {len(args.words)} words"
+            )
+        args.boards = len(args.words)
+    elif args.boards is None:
+        args.boards = 4
+    return args
+
+
+class MultiBoardGameState:
+    """
+    State of the game with several words guessed at once: each guess is
+    applied to every board not solved yet, so boards finish at different times.
+    """
+
+    def __init__(
+        self, correct_words: List[str], alphabet: str = russian_alphabet
+    ) -> None:
+        self.boards = [GameState(word, alphabet) for word in correct_words]
+        self.guesses: List[str] = []
+
+    def add_guess(self, guess: str) -> None:
+        "New guess"
+        for board, solved in zip(self.boards, self.solved):
+            if not solved:
+                board.add_guess(guess)
+        self.guesses.append(guess)
+
+    @property
+    def solved(self) -> List[bool]:
+        "Whether each of the boards is solved"
+        return [
+            board.number_of_attempts > 0
+            and all(
+                isinstance(letter, AcceptedLetterCorrectPosition)
+                for letter in board.guesses[-1]
+            )
+            for board in self.boards
+        ]
+
+    @property
+    def finished(self) -> bool:
+        return all(self.solved)
+
+    @property
+    def game_info(self) -> List[List[Letter]]:
+        "Information gained about each of the boards"
+        return [board.game_info for board in self.boards]
+
+    @property
+    def number_of_attempts(self) -> int:
+        return len(self.guesses)
+
+    def print_tabloid(self) -> None:
+        "Prints the boards side by side"
+        clear_screen()
+        length = len(self.boards[0].correct_word)
+        for turn in range(self.number_of_attempts):
+            row = [
+                (
+                    "".join(map(str, board.guesses[turn]))
+                    if turn < board.number_of_attempts
+                    else " " * length
+                )
+                for board in self.boards
+            ]
+            print(*row, sep="  ")
+
+
+class Board(CandidateTracker):
+    "Words still possible on one of the boards and whether the board is solved"
+
+    def reset(self) -> None:
+        super().reset()
+        self.solved = False
+
+    def update(self, info: List[Letter]) -> np.ndarray:
+        "Filters words still possible on the board and returns their indices"
+        candidates = super().update(info)
+        length = self.vocabulary.length
+        self.solved = len(info) >= length and all(
+            isinstance(letter, AcceptedLetterCorrectPosition)
+            for letter in info[-length:]
+        )
+        return candidates
+
+
+class MultiBoardAlgorithm(CuttingAlgorithm):
+    """
+    The cutting algorithm for several boards guessed at once. Each board keeps
+    its own candidates, a guess is valued by the statistic of words left summed
+    over the boards not solved yet. Guesses are the words still possible
+    on any of the boards, they are scored against the candidates of all the boards
+    in a single pass over the pattern matrix. Ties are resolved in favor
+    of the guesses possible on more boards.
+    """
+
+    def __init__(
+        self,
+        possible_words: Union["pd.DataFrame", Vocabulary],
+        boards: int = 4,
+        stat: str = "mean",
+        memory_limit: Optional[int] = None,
+    ) -> None:
+        super().__init__(possible_words, stat, memory_limit=memory_limit)
+        self.boards = [Board(self.vocabulary) for _ in range(boards)]
+
+    def update_boards(self, info: List[List[Letter]]) -> List[np.ndarray]:
+        "Filters words possible on each board, returns candidates of unsolved boards"
+        candidates = [
+            board.update(letters) for board, letters in zip(self.boards, info)
+        ]
+        return [c for board, c in zip(self.boards, candidates) if not board.solved]
+
+    @profiled("multiboard.score")
+    def score(
+        self, info: List[List[Letter]]
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Returns the guesses, the statistic of words left summed over the boards
+        and the number of boards each of the guesses is possible on.
+        """
+        boards = self.update_boards(info)
+        if not boards:
+            return np.zeros(0, dtype=int), np.zeros(0), np.zeros(0, dtype=int)
+        guesses = np.unique(np.concatenate(boards))
+        statistic = board_statistics(
+            self.patterns,
+            guesses,
+            boards,
+            {self.stat: supported_statistics[self.stat]},
+            self.patterns_count,
+            self.memory_limit,
+        )[self.stat].sum(axis=1)
+        possible = sum(np.isin(guesses, board, assume_unique=True) for board in boards)
+        return guesses, statistic, possible
+
+    def rank_guesses(self, info: List[List[Letter]]) -> "pd.DataFrame":
+        "Ranks the words possible on any board by the total statistic"
+        import pandas as pd
+
+        guesses, statistic, possible = self.score(info)
+        order = np.lexsort((-possible, statistic))
+        return pd.DataFrame(
+            {
+                "word": self.all_words["word"].to_numpy()[guesses[order]],
+                self.stat: statistic[order],
+                "boards": possible[order],
+            }
+        )
+
+    def top_guesses(self, info: List[List[Letter]], k: int) -> "pd.DataFrame":
+        return self.rank_guesses(info).head(k)
+
+    def rank_progressively(
+        self, info: List[List[Letter]], n: int, deadline: Optional[float] = None
+    ) -> Iterator[Tuple["pd.DataFrame", bool]]:
+        "Ranks all the guesses at once"
+        yield self.rank_guesses(info).head(n), True
+
+    def guess(self, info: List[List[Letter]]) -> str:
+        "Returns the guess leaving fewest words in total"
+        guesses, statistic, possible = self.score(info)
+        best = np.lexsort((-possible, statistic))[0]
+        return self.vocabulary.word(guesses[best])
+
+
+def play_multiboard(
+    correct_words: List[str],
+    possible_words: Vocabulary,
+    guesser: Optional[MultiBoardAlgorithm] = None,
+    attempts: Optional[int] = None,
+) -> None:
+    """
+    Plays a round of the game guessing several words at once.
+    The game is played manually if the algorithm is not specified.
+    """
+    attempts = len(correct_words) + 5 if attempts is None else attempts
+    game_state = MultiBoardGameState(correct_words, possible_words.alphabet)
+    while game_state.number_of_attempts < attempts:
+        game_state.print_tabloid()
+        start_turn()
+        if guesser is None:
+            guess = input().strip().lower()
+        else:
+            guess = guesser.guess(game_state.game_info)
+        end_turn()
+        print(guess)
+        if guess == "":
+            print("Exiting.")
+            return
+        if guess not in possible_words.index:
+            if guesser is not None:
+                raise IncorrectWord(
+                    f"Automatic algorithm returned a word not present in the table of all possible words: {guess}"
+                )
+            continue
+        game_state.add_guess(guess)
+        if game_state.finished:
+            game_state.print_tabloid()
+            print(
+                f"Congratulations, you guessed all the words in {game_state.number_of_attempts} attempts!"
+            )
+            return
+    game_state.print_tabloid()
+    print(f"Out of attempts. The words were: {' '.join(correct_words)}.")
+
+
+def main():
+    args = parse_args()
+    profiler = enable() if args.profile is not None else None
+    possible_words = load_vocabulary(args.t)
+    if args.words:
+        correct_words = [word.lower() for word in args.words]
+    else:
+        correct_words = sample(possible_words.words, args.boards)
+    for word in correct_words:
+        if word not in possible_words.index:
+            raise IncorrectWord(
+                f'You typed in the word "{word}" which is not in the table of all possible words.'
+            )
+    guesser = None
+    if args.auto:
+        guesser = MultiBoardAlgorithm(possible_words, args.boards, args.stat)
+    play_multiboard(correct_words, possible_words, guesser, args.attempts)
+    if profiler is not None:
+        profiler.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from patterns import pattern_statistics
+
+# state of a worker process: the pattern matrix and the mask of candidates
+worker_state: Dict[str, object] = {}
+
+
+class SharedArray:
+    """
+    Numpy array placed in shared memory. Pickled as the name of the shared
+    memory block, so worker processes attach to it instead of copying it.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype: str, name: str = None) -> None:
+        self.shape = shape
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(1, int(np.prod(shape)) * self.dtype.itemsize)
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(shape, self.dtype, buffer=self.memory.buf)
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype.str, self.memory.name)
+
+    def close(self) -> None:
+        "Releases the block, the owner also destroys it"
+        del self.array
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def initialize_worker(
+    patterns_path: str,
+    mask: SharedArray,
+    patterns_count: int,
+    memory_limit: Optional[int],
+) -> None:
+    "Memory-maps the pattern matrix and attaches to the mask of candidates."
+    worker_state["patterns"] = np.load(patterns_path, mmap_mode="r")
+    worker_state["mask"] = mask
+    worker_state["patterns_count"] = patterns_count
+    worker_state["memory_limit"] = memory_limit
+
+
+def score_shard(positions: np.ndarray, statistics: Dict) -> Dict[str, np.ndarray]:
+    "Computes statistics of words left for the candidates at the positions as guesses."
+    candidates = np.flatnonzero(worker_state["mask"].array)
+    return pattern_statistics(
+        worker_state["patterns"],
+        candidates[positions],
+        candidates,
+        statistics,
+        worker_state["patterns_count"],
+        worker_state["memory_limit"],
+    )
+
+
+class ShardedScorer:
+    """
+    Pool of processes scoring guesses in shards. The pattern matrix is
+    memory-mapped by every worker from the cache file and the mask of
+    candidates lives in shared memory, so nothing but positions of guesses
+    and statistics is sent between processes.
+    """
+
+    def __init__(
+        self,
+        patterns_path: str,
+        size: int,
+        workers: int,
+        patterns_count: int,
+        memory_limit: Optional[int] = None,
+    ) -> None:
+        self.workers = workers
+        self.mask = SharedArray((size,), "?")
+        self.pool = ProcessPoolExecutor(
+            workers,
+            initializer=initialize_worker,
+            initargs=(patterns_path, self.mask, patterns_count, memory_limit),
+        )
+
+    def statistics(
+        self,
+        candidates: np.ndarray,
+        statistics: Dict,
+        positions: Optional[np.ndarray] = None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Splits the guesses, the candidates at the positions or all of them
+        if not specified, into shards, scores them on the pool and merges
+        the results in the order of the guesses. The candidates are expected
+        to be sorted.
+        """
+        self.mask.array[:] = False
+        self.mask.array[candidates] = True
+        if positions is None:
+            positions = np.arange(len(candidates))
+        shard_size = max(1, -(-len(positions) // (4 * self.workers)))
+        futures = [
+            self.pool.submit(
+                score_shard, positions[start : start + shard_size], statistics
+            )
+            for start in range(0, len(positions), shard_size)
+        ]
+        results = [future.result() for future in futures]
+        return {
+            name: np.concatenate([result[name] for result in results])
+            for name in statistics
+        }
+
+    def close(self) -> None:
+        "Stops the workers and frees the shared memory"
+        self.pool.shutdown()
+        self.mask.close()
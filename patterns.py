@@ -0,0 +1,285 @@
+import os
+from threading import Lock
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from vocabulary import Vocabulary
+from gameinfo import Letter, AcceptedLetterWrongPosition, AcceptedLetterCorrectPosition
+from profiling import profiled
+
+cache_directory = "./.cache"
+# version of feedback patterns, cached matrices of other versions are not used
+patterns_version = 2
+# pattern matrices memory-mapped by this process, shared by all the algorithms
+loaded_pattern_matrices: Dict[str, np.ndarray] = {}
+loaded_pattern_matrices_lock = Lock()
+
+# bound of memory taken by temporary arrays of computations in blocks, bytes
+memory_limit = 256 * 2**20
+
+rejected_code = 0
+wrong_position_code = 1
+correct_position_code = 2
+
+
+def number_of_patterns(length: int) -> int:
+    "Number of feedback patterns for words of the length"
+    return 3**length
+
+
+def solved_pattern(length: int) -> int:
+    "Feedback pattern of the guessed word"
+    return number_of_patterns(length) - 1
+
+
+def pattern_dtype(length: int) -> type:
+    "The smallest type holding feedback patterns for words of the length"
+    if number_of_patterns(length) <= 2**8:
+        return np.uint8
+    if number_of_patterns(length) <= 2**16:
+        return np.uint16
+    return np.uint32
+
+
+def block_rows(row_bytes: int, limit: Optional[int] = None) -> int:
+    "Number of rows taking row_bytes each which fit into the memory limit"
+    limit = memory_limit if limit is None else limit
+    return max(1, limit // max(1, row_bytes))
+
+
+def compute_patterns(
+    guess_codes: np.ndarray, target_codes: np.ndarray, target_presence: np.ndarray
+) -> np.ndarray:
+    """
+    Computes feedback patterns for every pair of guess and target words.
+    Feedback for the letter at position i is encoded as the i-th digit of
+    the pattern in base 3: 0 - the letter is absent in the target, 1 - the
+    letter is present, but at another position, 2 - the position is correct.
+    A repeated letter of the guess is present as many times as it is met
+    in the target, as classify_guess does: correct positions first, then
+    from left to right.
+    """
+    length = guess_codes.shape[1]
+    dtype = pattern_dtype(length)
+    patterns = np.zeros((len(guess_codes), len(target_codes)), dtype=dtype)
+    correct = guess_codes[:, :, np.newaxis] == target_codes.T[np.newaxis, :, :]
+    same = guess_codes[:, :, np.newaxis] == guess_codes[:, np.newaxis, :]
+    for position in range(length):
+        letters = guess_codes[:, position, np.newaxis]
+        shifts = letters.astype(target_presence.dtype)
+        code = ((target_presence[np.newaxis, :] >> shifts) & 1).astype(dtype)
+        repeated = np.flatnonzero(same[:, position].sum(axis=1) > 1)
+        if len(repeated):
+            # occurrences of the letter taken by the earlier ones and the correct ones
+            taken = np.zeros((len(repeated), len(target_codes)), dtype=np.int8)
+            for other in range(length):
+                if other < position:
+                    taken += same[repeated, position, other, np.newaxis]
+                elif other > position:
+                    taken += (
+                        same[repeated, position, other, np.newaxis]
+                        & correct[repeated, other]
+                    )
+            count = (target_codes[np.newaxis] == letters[repeated, :, np.newaxis]).sum(
+                axis=2, dtype=np.int8
+            )
+            code[repeated] = count > taken
+        code[correct[:, position]] = correct_position_code
+        patterns += code * dtype(3**position)
+    return patterns
+
+
+def pattern_of_letters(letters: List[Letter]) -> int:
+    "Encodes information about the letters of a single guess as a pattern."
+    pattern = 0
+    for position, letter in enumerate(letters):
+        if isinstance(letter, AcceptedLetterCorrectPosition):
+            pattern += correct_position_code * 3**position
+        elif isinstance(letter, AcceptedLetterWrongPosition):
+            pattern += wrong_position_code * 3**position
+    return pattern
+
+
+def compute_pattern_matrix(
+    vocabulary: Vocabulary, out: np.ndarray = None, limit: Optional[int] = None
+) -> np.ndarray:
+    """
+    Computes the (N, N) matrix of feedback patterns for the vocabulary
+    in blocks of rows fitting into the memory limit. Writes the rows
+    to the output array, e.g. a file mapped to memory, if it is given.
+    """
+    size = len(vocabulary)
+    if out is None:
+        out = np.empty((size, size), dtype=pattern_dtype(vocabulary.length))
+    # temporary arrays of compute_patterns take about 32 bytes per pair of words
+    rows = block_rows(32 * size, limit)
+    for start in range(0, size, rows):
+        out[start : start + rows] = compute_patterns(
+            vocabulary.codes[start : start + rows],
+            vocabulary.codes,
+            vocabulary.presence,
+        )
+    return out
+
+
+def pattern_matrix_path(vocabulary: Vocabulary) -> str:
+    "Path of the cached pattern matrix of the vocabulary."
+    return os.path.join(
+        cache_directory, f"patterns-v{patterns_version}-{vocabulary.digest[:16]}.npy"
+    )
+
+
+@profiled("patterns.load_pattern_matrix")
+def load_pattern_matrix(
+    vocabulary: Vocabulary, limit: Optional[int] = None
+) -> np.ndarray:
+    """
+    Loads the matrix of feedback patterns of the vocabulary memory-mapping
+    the file cached on disk. The matrix is computed and cached first if it
+    has not been computed for this word list before, rows are streamed
+    to the file block by block. Each matrix is mapped once per process,
+    threads loading the same matrix wait for the first one.
+    """
+    path = pattern_matrix_path(vocabulary)
+    with loaded_pattern_matrices_lock:
+        if path in loaded_pattern_matrices:
+            return loaded_pattern_matrices[path]
+        if not os.path.exists(path):
+            os.makedirs(cache_directory, exist_ok=True)
+            temporary_path = f"{path}.{os.getpid()}.tmp"
+            size = len(vocabulary)
+            out = np.lib.format.open_memmap(
+                temporary_path, "w+", pattern_dtype(vocabulary.length), (size, size)
+            )
+            compute_pattern_matrix(vocabulary, out, limit)
+            out.flush()
+            del out
+            os.replace(temporary_path, path)
+        loaded_pattern_matrices[path] = np.load(path, mmap_mode="r")
+        return loaded_pattern_matrices[path]
+
+
+def pattern_histograms(
+    patterns: np.ndarray, patterns_count: int = None, block_size: int = 256
+) -> np.ndarray:
+    """
+    For each guess (row of the matrix of patterns) counts the number of
+    target words giving each of the patterns. The number of patterns
+    is taken from the patterns if not specified.
+    """
+    if patterns_count is None:
+        patterns_count = int(patterns.max()) + 1 if patterns.size else 1
+    histograms = np.empty((len(patterns), patterns_count), dtype=np.int64)
+    for start in range(0, len(patterns), block_size):
+        block = patterns[start : start + block_size]
+        offsets = np.arange(len(block))[:, np.newaxis] * patterns_count
+        counts = np.bincount(
+            (block + offsets).ravel(), minlength=len(block) * patterns_count
+        )
+        histograms[start : start + len(block)] = counts.reshape(len(block), -1)
+    return histograms
+
+
+def pattern_statistics(
+    patterns: np.ndarray,
+    guesses: np.ndarray,
+    targets: np.ndarray,
+    statistics: Dict[str, Callable],
+    patterns_count: int,
+    limit: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Computes the statistics of histograms of feedback patterns of the guesses
+    over the targets. Patterns and histograms are taken for blocks of guesses
+    fitting into the memory limit, so the matrix can be larger than the memory.
+    """
+    row_bytes = len(targets) * (patterns.itemsize + 8) + 16 * patterns_count
+    rows = block_rows(row_bytes, limit)
+    results: Dict[str, List[np.ndarray]] = {name: [] for name in statistics}
+    for start in range(0, len(guesses), rows):
+        block = patterns[np.ix_(guesses[start : start + rows], targets)]
+        histograms = pattern_histograms(block, patterns_count, rows)
+        for name, f in statistics.items():
+            results[name].append(f(histograms))
+    return {
+        name: np.concatenate(values) if values else np.zeros(0)
+        for name, values in results.items()
+    }
+
+
+def board_statistics(
+    patterns: np.ndarray,
+    guesses: np.ndarray,
+    boards: List[np.ndarray],
+    statistics: Dict[str, Callable],
+    patterns_count: int,
+    limit: Optional[int] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Computes the statistics of histograms of feedback patterns of the guesses
+    over the targets of each of the boards as (guesses, boards) arrays.
+    Patterns of the targets of all the boards are taken in a single pass
+    and shifted by the board, so one histogram per guess covers all the boards.
+    """
+    targets = np.concatenate(boards)
+    sizes = [len(board) for board in boards]
+    shifts = np.repeat(np.arange(len(boards)) * patterns_count, sizes)
+    width = len(boards) * patterns_count
+    row_bytes = len(targets) * (patterns.itemsize + 16) + 16 * width
+    rows = block_rows(row_bytes, limit)
+    results = {
+        name: np.empty((len(guesses), len(boards)), dtype=np.float64)
+        for name in statistics
+    }
+    for start in range(0, len(guesses), rows):
+        block = patterns[np.ix_(guesses[start : start + rows], targets)] + shifts
+        histograms = pattern_histograms(block, width, rows)
+        histograms = histograms.reshape(-1, patterns_count)
+        for name, f in statistics.items():
+            results[name][start : start + len(block)] = f(histograms).reshape(
+                len(block), len(boards)
+            )
+    return results
+
+
+def histogram_mean(histograms: np.ndarray) -> np.ndarray:
+    "Average number of words left: each bucket of size n is met n times."
+    return (histograms**2).sum(axis=1) / histograms.sum(axis=1)
+
+
+def histogram_max(histograms: np.ndarray) -> np.ndarray:
+    "Maximal number of words left."
+    return histograms.max(axis=1)
+
+
+def histogram_median(histograms: np.ndarray) -> np.ndarray:
+    "Median number of words left."
+    sizes = np.sort(histograms, axis=1)
+    cumulative = sizes.cumsum(axis=1)
+    total = cumulative[:, -1:]
+
+    def element(k: np.ndarray) -> np.ndarray:
+        "k-th smallest number of words left for each guess"
+        return np.take_along_axis(sizes, (cumulative > k).argmax(axis=1)[:, None], 1)
+
+    return ((element((total - 1) // 2) + element(total // 2)) / 2).ravel()
+
+
+def histogram_mode(histograms: np.ndarray) -> np.ndarray:
+    """
+    Most common number of words left. Ties are resolved in favor of
+    the smallest number.
+    """
+    sizes = np.sort(histograms, axis=1)
+    columns = np.arange(sizes.shape[1])
+    starts = np.ones_like(sizes, dtype=bool)
+    starts[:, 1:] = sizes[:, 1:] != sizes[:, :-1]
+    run_start = np.maximum.accumulate(np.where(starts, columns, 0), axis=1)
+    ends = np.ones_like(sizes, dtype=bool)
+    ends[:, :-1] = starts[:, 1:]
+    run_end = np.minimum.accumulate(
+        np.where(ends, columns, sizes.shape[1])[:, ::-1], axis=1
+    )[:, ::-1]
+    frequency = np.where(sizes > 0, sizes * (run_end - run_start + 1), -1)
+    return np.take_along_axis(sizes, frequency.argmax(axis=1)[:, None], 1).ravel()
@@ -0,0 +1,124 @@
+import json
+from functools import wraps
+from threading import Lock
+from time import perf_counter
+from typing import Dict, List, Optional
+
+
+class Profiler:
+    """
+    Accumulates time spent in stages of the game and numbers of calls
+    turn by turn. Time of nested stages is included in the enclosing ones.
+    """
+
+    def __init__(self) -> None:
+        self.lock = Lock()
+        self.turns: List[Dict] = []
+        self.stages: Dict[str, List] = {}
+        self.turn_started = perf_counter()
+
+    def record(self, name: str, seconds: float) -> None:
+        "Adds a call of the stage"
+        with self.lock:
+            entry = self.stages.setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+    def start_turn(self) -> None:
+        with self.lock:
+            self.turn_started = perf_counter()
+
+    def end_turn(self) -> Dict:
+        "Closes the turn and returns its summary"
+        with self.lock:
+            turn = {
+                "turn": len(self.turns) + 1,
+                "seconds": perf_counter() - self.turn_started,
+                "stages": {
+                    name: {"calls": calls, "seconds": seconds}
+                    for name, (calls, seconds) in sorted(self.stages.items())
+                },
+            }
+            self.turns.append(turn)
+            self.stages = {}
+        return turn
+
+    def summary(self) -> Dict:
+        "Summaries of all the turns and their totals for the game"
+        stages: Dict[str, Dict] = {}
+        for turn in self.turns:
+            for name, stage in turn["stages"].items():
+                total = stages.setdefault(name, {"calls": 0, "seconds": 0.0})
+                total["calls"] += stage["calls"]
+                total["seconds"] += stage["seconds"]
+        game = {
+            "turns": len(self.turns),
+            "seconds": sum(turn["seconds"] for turn in self.turns),
+            "stages": dict(sorted(stages.items())),
+        }
+        return {"turns": self.turns, "game": game}
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+
+
+# profiler of the process, profiling is disabled if None
+profiler: Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    "Starts profiling from scratch"
+    global profiler
+    profiler = Profiler()
+    return profiler
+
+
+def start_turn() -> None:
+    if profiler is not None:
+        profiler.start_turn()
+
+
+def end_turn() -> None:
+    if profiler is not None:
+        profiler.end_turn()
+
+
+class stage:
+    "Context manager recording time of a block of code as the stage"
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.start: Optional[float] = None
+
+    def __enter__(self) -> "stage":
+        if profiler is not None:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exception) -> None:
+        if self.start is not None and profiler is not None:
+            profiler.record(self.name, perf_counter() - self.start)
+            self.start = None
+
+
+def profiled(name: str):
+    """
+    Decorates a function so that its calls are recorded as the stage.
+    Costs a single check when profiling is disabled.
+    """
+
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if profiler is None:
+                return function(*args, **kwargs)
+            start = perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, perf_counter() - start)
+
+        return wrapper
+
+    return decorator
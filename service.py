@@ -0,0 +1,235 @@
+import asyncio
+import json
+from time import perf_counter
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple, TYPE_CHECKING
+from uuid import uuid4
+
+
+from gameinfo import Constraint
+from dictionary import load_vocabulary
+from interaction import parse_line, to_json
+from patterns import load_pattern_matrix
+from profiling import enable, stage
+from vocabulary import Vocabulary
+from wordlealgorithm import (
+    WordleAlgorithm,
+    RankingCache,
+    make_algorithm,
+    supported_algorithms,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class ServiceError(ValueError):
+    """Raised when a request can not be served"""
+
+    pass
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="host to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on")
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=1024,
+        help="number of rankings cached in memory, 0 to disable the cache",
+    )
+    parser.add_argument(
+        "--cache-path",
+        default=None,
+        help="path to the file to persist cached rankings in",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=None,
+        help="number of threads scoring guesses off the event loop",
+    )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages of all the requests to on exit",
+    )
+    return parser.parse_args()
+
+
+class Session:
+    """
+    A game of a single user: the algorithm and the constraint compiled
+    from the information gained so far.
+    Requests of a session are served one at a time.
+    """
+
+    def __init__(self, algorithm: WordleAlgorithm) -> None:
+        self.algorithm = algorithm
+        self.info = Constraint(
+            algorithm.vocabulary.length, len(algorithm.vocabulary.alphabet)
+        )
+        self.lock = asyncio.Lock()
+
+
+def rank(
+    algorithm: WordleAlgorithm,
+    info: Constraint,
+    n: int,
+    time_limit: Optional[float] = None,
+) -> Tuple["pd.DataFrame", bool]:
+    """
+    Top n guesses and whether the ranking is final. Without the time limit
+    all the guesses are ranked, otherwise the best ranking found in time is returned.
+    """
+    if time_limit is None:
+        return algorithm.top_guesses(info, n), True
+    deadline = perf_counter() + time_limit
+    for ranking, final in algorithm.rank_progressively(info, n, deadline):
+        pass
+    return ranking, final
+
+
+class SolverService:
+    """
+    Serves many independent sessions over line-delimited JSON. All the sessions
+    share the vocabulary and the pattern matrix loaded once, and rankings
+    are computed on a pool of threads so that the event loop is never blocked.
+
+    Each request is a JSON object with a "command":
+    - "new" with "algorithm" and optional "options" starts a session;
+    - "feedback" with "session" and "feedback" in the letter/code syntax;
+    - "rank" with "session" and optional "n" returns top n guesses,
+      with optional "deadline" in seconds the best ranking found by then;
+    - "guess" with "session" returns the best guess;
+    - "close" with "session" ends the session;
+    - "stats" returns the number of sessions and counters of the ranking cache.
+    """
+
+    def __init__(self, vocabulary: Vocabulary, threads: int = None) -> None:
+        self.vocabulary = vocabulary
+        # sessions started concurrently find the matrix already loaded
+        load_pattern_matrix(vocabulary)
+        self.executor = ThreadPoolExecutor(threads)
+        self.sessions: Dict[str, Session] = {}
+
+    async def run(self, function, *args):
+        "Runs CPU-heavy function on the pool of threads"
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, function, *args)
+
+    def session(self, request: Dict) -> Session:
+        try:
+            return self.sessions[request["session"]]
+        except KeyError:
+            raise ServiceError(f"Unknown session: {request.get('session')}")
+
+    async def handle(self, request: Dict) -> Dict:
+        "Serves a single request"
+        command = request.get("command")
+        if command == "new":
+            name = request.get("algorithm", "cutting")
+            if name not in supported_algorithms or name == "manual":
+                raise ServiceError(f"Unknown algorithm: {name}")
+            options = request.get("options", {})
+            if not isinstance(options, dict):
+                raise ServiceError("Options should be a JSON object.")
+            algorithm = await self.run(
+                lambda: make_algorithm(name, self.vocabulary, **options)
+            )
+            session_id = uuid4().hex
+            self.sessions[session_id] = Session(algorithm)
+            return {"session": session_id}
+        if command == "close":
+            self.sessions.pop(request.get("session"), None)
+            return {}
+        if command == "stats":
+            cache = WordleAlgorithm.ranking_cache
+            return {
+                "sessions": len(self.sessions),
+                "cache": cache.statistics() if cache is not None else None,
+            }
+
+        session = self.session(request)
+        async with session.lock:
+            if command == "feedback":
+                vocabulary = session.algorithm.vocabulary
+                letters = parse_line(
+                    request.get("feedback", ""), vocabulary.alphabet, vocabulary.length
+                )
+                if letters:
+                    session.info.update(letters)
+                candidates = await self.run(session.algorithm.update, session.info)
+                return {"possible": len(candidates)}
+            if command == "rank":
+                n = request.get("n", 15)
+                ranking, final = await self.run(
+                    rank, session.algorithm, session.info, n, request.get("deadline")
+                )
+                return {
+                    "possible": len(session.algorithm.candidates),
+                    "ranking": ranking.to_dict("records"),
+                    "final": final,
+                }
+            if command == "guess":
+                guess = await self.run(session.algorithm.guess, session.info)
+                return {"guess": guess}
+        raise ServiceError(f"Unknown command: {command}")
+
+    async def serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        "Reads requests line by line and writes a response line for each"
+        while line := await reader.readline():
+            request = None
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ServiceError("A request should be a JSON object.")
+                with stage(f"service.{request.get('command')}"):
+                    response = {"ok": True, **await self.handle(request)}
+            except Exception as error:
+                # a failed request must not end the connection of the client
+                response = {"ok": False, "error": str(error) or repr(error)}
+            if isinstance(request, dict) and "id" in request:
+                response["id"] = request["id"]
+            text = json.dumps(response, ensure_ascii=False, default=to_json)
+            writer.write(text.encode("utf-8") + b"\n")
+            await writer.drain()
+        writer.close()
+
+    async def serve(self, host: str, port: int) -> None:
+        server = await asyncio.start_server(self.serve_client, host, port)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    args = parse_args()
+    profiler = enable() if args.profile is not None else None
+    if args.cache_size > 0:
+        WordleAlgorithm.ranking_cache = RankingCache(args.cache_size, args.cache_path)
+    service = SolverService(load_vocabulary(args.t), args.threads)
+    print(f"Serving on {args.host}:{args.port}.")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    finally:
+        if WordleAlgorithm.ranking_cache is not None:
+            WordleAlgorithm.ranking_cache.close()
+        if profiler is not None:
+            # requests of the sessions interleave, the whole run is a single turn
+            profiler.end_turn()
+            profiler.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import json
+import os
+import platform
+from argparse import ArgumentParser, Namespace
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary
+from wordlealgorithm import make_algorithm
+from wordle import GameState
+from profiling import enable, start_turn, end_turn
+
+statistics_to_simulate = ["mean", "max", "mode", "median"]
+latency_percentiles = [50, 90, 99]
+
+# all possible words loaded once by each worker process
+possible_words: Optional[Vocabulary] = None
+
+
+def parse_args() -> Namespace:
+    parser = ArgumentParser()
+    parser.add_argument(
+        "--t",
+        default="./five_letter_words.csv",
+        help="path to file with all possible words",
+    )
+    parser.add_argument(
+        "--algorithm",
+        nargs="+",
+        default=["greedy", "cutting"],
+        choices=["greedy", "cutting", "tree", "lookahead"],
+        help="algorithms to simulate",
+    )
+    parser.add_argument(
+        "--stat",
+        nargs="+",
+        default=statistics_to_simulate,
+        choices=statistics_to_simulate,
+        help="statistics to simulate cutting, tree and lookahead algorithms with",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes",
+    )
+    parser.add_argument(
+        "--attempts",
+        type=int,
+        default=6,
+        help="number of attempts after which a game is considered lost",
+    )
+    parser.add_argument(
+        "--limit",
+        type=int,
+        default=None,
+        help="number of target words to play, all words if not specified",
+    )
+    parser.add_argument(
+        "--out", default="simulation.json", help="path to the file with results"
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="add time of stages per turn and per game to the results of each game",
+    )
+    return parser.parse_args()
+
+
+def configurations(args: Namespace) -> List[Tuple[str, Dict]]:
+    "Algorithms and their options to simulate."
+    runs = []
+    for name in args.algorithm:
+        if name == "lookahead":
+            runs.extend(
+                (name, {"stat": stat}) for stat in args.stat if stat in ("mean", "max")
+            )
+        elif name in ("cutting", "tree"):
+            runs.extend((name, {"stat": stat}) for stat in args.stat)
+        else:
+            runs.append((name, {}))
+    return runs
+
+
+def initialize_worker(path: str) -> None:
+    "Loads all possible words in a worker process."
+    global possible_words
+    possible_words = load_vocabulary(path)
+
+
+def play_games(
+    name: str,
+    options: Dict,
+    targets: List[str],
+    max_guesses: int,
+    profile: bool = False,
+) -> List[Dict]:
+    """
+    Plays a game for each of the target words without any output
+    and returns guesses made together with time spent on each of them.
+    """
+    results = []
+    guesser = make_algorithm(name, possible_words, **options)
+    for target in targets:
+        profiler = enable() if profile else None
+        game_state = GameState(target, possible_words.alphabet)
+        guesses, latencies = [], []
+        while game_state.number_of_attempts < max_guesses:
+            start_turn()
+            start = perf_counter()
+            guess = guesser.guess(game_state.game_info)
+            latencies.append(perf_counter() - start)
+            guesses.append(guess)
+            game_state.add_guess(guess)
+            end_turn()
+            if guess == target:
+                break
+        result = {
+            "word": target,
+            "solved": guesses[-1] == target,
+            "guesses": guesses,
+            "latencies": latencies,
+        }
+        if profiler is not None:
+            result["profile"] = profiler.summary()
+        results.append(result)
+    return results
+
+
+def summarize(name: str, options: Dict, results: List[Dict], attempts: int) -> Dict:
+    "Computes statistics of a simulation run."
+    solved = [len(r["guesses"]) for r in results if r["solved"]]
+    failures = sum(not r["solved"] or len(r["guesses"]) > attempts for r in results)
+    latencies = np.array([t for r in results for t in r["latencies"]])
+    return {
+        "algorithm": name,
+        "options": options,
+        "games": len(results),
+        "failures": failures,
+        "failure_rate": failures / len(results),
+        "mean_attempts": float(np.mean(solved)) if solved else None,
+        "attempts": {str(k): v for k, v in sorted(Counter(solved).items())},
+        "latency": {
+            **{
+                f"p{q}": float(np.percentile(latencies, q)) for q in latency_percentiles
+            },
+            "max": float(latencies.max()),
+        },
+        "results": results,
+    }
+
+
+def simulate(
+    path: str,
+    runs: List[Tuple[str, Dict]],
+    targets: List[str],
+    workers: int,
+    attempts: int,
+    profile: bool = False,
+) -> List[Dict]:
+    """
+    Plays all the target words with each of the algorithms on a pool
+    of processes and returns summary of each run.
+    """
+    max_guesses = 4 * attempts
+    chunk = max(1, len(targets) // (4 * workers))
+    shards = [targets[i : i + chunk] for i in range(0, len(targets), chunk)]
+    summaries = []
+    with ProcessPoolExecutor(
+        workers, initializer=initialize_worker, initargs=(path,)
+    ) as pool:
+        for name, options in runs:
+            futures = [
+                pool.submit(play_games, name, options, shard, max_guesses, profile)
+                for shard in shards
+            ]
+            results = [r for future in futures for r in future.result()]
+            summary = summarize(name, options, results, attempts)
+            print(
+                f"{name} {options}: failure rate {summary['failure_rate']:.4f}, "
+                f"mean attempts {summary['mean_attempts']}"
+            )
+            summaries.append(summary)
+    return summaries
+
+
+def main():
+    args = parse_args()
+    vocabulary = load_vocabulary(args.t)
+    targets = vocabulary.words[: args.limit]
+    runs = simulate(
+        args.t,
+        configurations(args),
+        targets,
+        args.workers,
+        args.attempts,
+        args.profile,
+    )
+    report = {
+        "dictionary": args.t,
+        "digest": vocabulary.digest,
+        "attempts": args.attempts,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "runs": runs,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+import patterns as patterns_module
+from biggest_cut import CuttingAlgorithm, sampled_estimates, supported_statistics
+from dictionary import load_vocabulary
+from gameinfo import classify_guess
+from patterns import compute_patterns, number_of_patterns, pattern_histograms
+from vocabulary import Vocabulary
+
+
+@pytest.fixture(scope="module")
+def vocabulary() -> Vocabulary:
+    words = load_vocabulary("./five_letter_words.csv").words
+    return Vocabulary.from_words(words[::3])
+
+
+@pytest.fixture(scope="module")
+def patterns(vocabulary: Vocabulary) -> np.ndarray:
+    codes = vocabulary.codes
+    return compute_patterns(codes, codes, vocabulary.presence)
+
+
+@pytest.mark.parametrize("stat", ["mean", "max", "median"])
+def test_sampled_intervals_cover_exact_statistics(vocabulary, patterns, stat):
+    patterns_count = number_of_patterns(vocabulary.length)
+    exact = supported_statistics[stat](pattern_histograms(patterns, patterns_count))
+    population = len(vocabulary)
+    covered = []
+    for seed in range(5):
+        targets = np.random.default_rng(seed).permutation(population)[:128]
+        histograms = pattern_histograms(patterns[:, np.sort(targets)], patterns_count)
+        estimates, errors = sampled_estimates(histograms, population, stat)
+        covered.append(np.abs(estimates - exact) <= errors)
+    assert np.mean(covered) >= 0.9
+
+
+def test_sampled_mean_of_all_targets_is_exact(vocabulary, patterns):
+    histograms = pattern_histograms(patterns, number_of_patterns(vocabulary.length))
+    estimates, errors = sampled_estimates(histograms, len(vocabulary), "mean")
+    assert np.allclose(estimates, supported_statistics["mean"](histograms))
+    assert not errors.any()
+
+
+def test_mode_is_not_sampled(vocabulary):
+    with pytest.raises(ValueError):
+        CuttingAlgorithm(vocabulary, "mode", approx=True)
+
+
+def test_kept_histograms_match_recount(vocabulary, tmp_path, monkeypatch):
+    monkeypatch.setattr(patterns_module, "cache_directory", str(tmp_path))
+    algorithm = CuttingAlgorithm(vocabulary)
+    rng = np.random.default_rng(0)
+    subtracted = 0
+    for target in rng.choice(vocabulary.words, 5):
+        letters = []
+        algorithm.estimate_cuts(letters)
+        for guess in rng.choice(vocabulary.words, 2):
+            # letter by letter, so that few words are eliminated at a time
+            for letter in classify_guess(str(guess), str(target)):
+                left = len(algorithm.candidates)
+                letters = letters + [letter]
+                candidates = algorithm.update(letters)
+                subtracted += 0 < left - len(candidates) <= len(candidates)
+                expected = algorithm.count_patterns(candidates, candidates)
+                assert np.array_equal(algorithm.histograms, expected)
+    assert subtracted
@@ -0,0 +1,74 @@
+from decisiontree import DecisionTreeAlgorithm, build_tree
+from dictionary import load_vocabulary
+from gameinfo import (
+    AcceptedLetterCorrectPosition,
+    Constraint,
+    RejectedLetter,
+    classify_guess,
+)
+from interaction import parse_line
+from patterns import compute_patterns
+from vocabulary import Vocabulary
+
+
+def tree_algorithm(words, tmp_path) -> DecisionTreeAlgorithm:
+    vocabulary = Vocabulary.from_words(words)
+    codes = vocabulary.codes
+    patterns = compute_patterns(codes, codes, vocabulary.presence)
+    path = str(tmp_path / "tree.bin")
+    build_tree(vocabulary, patterns, "mean").save(path)
+    return DecisionTreeAlgorithm(vocabulary, "mean", path)
+
+
+def typed(letters) -> str:
+    "Feedback in the letter/code syntax, rejected letters have no position"
+    tokens = []
+    for l in letters:
+        if isinstance(l, RejectedLetter):
+            code = 0
+        elif isinstance(l, AcceptedLetterCorrectPosition):
+            code = l.position
+        else:
+            code = -l.position
+        tokens.append(f"{l.letter} {code}")
+    return " ".join(tokens)
+
+
+def test_constraint_follows_the_tree(tmp_path):
+    words = load_vocabulary("./five_letter_words.csv").words[::10]
+    algorithm = tree_algorithm(words, tmp_path)
+    for target in words[::7]:
+        letters, constraint = [], Constraint()
+        while True:
+            guess = algorithm.lookup(constraint)
+            assert guess is not None
+            assert guess == algorithm.lookup(letters)
+            feedback = classify_guess(guess, target)
+            letters += feedback
+            constraint.update(feedback)
+            if guess == target:
+                break
+    assert algorithm.fallback is None
+
+
+def test_typed_feedback_follows_the_tree(tmp_path):
+    words = load_vocabulary("./five_letter_words.csv").words[::10]
+    algorithm = tree_algorithm(words, tmp_path)
+    session = DecisionTreeAlgorithm(
+        algorithm.vocabulary, "mean", str(tmp_path / "tree.bin")
+    )
+    found = 0
+    for target in words[::7]:
+        letters, constraint = [], Constraint()
+        while True:
+            guess = algorithm.lookup(letters)
+            match = session.lookup(constraint)
+            assert match in (guess, None)
+            found += match is not None
+            feedback = classify_guess(guess, target)
+            letters += feedback
+            constraint.update(parse_line(typed(feedback)))
+            if guess == target:
+                break
+    assert found > len(words[::7])
+    assert session.fallback is None
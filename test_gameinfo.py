@@ -0,0 +1,40 @@
+from gameinfo import Constraint, classify_guess
+from interaction import parse_line
+from patterns import compute_patterns, pattern_of_letters
+from vocabulary import Vocabulary
+
+words = ["город", "горох", "топор", "робот", "порог", "гонор", "ворон", "сокол"]
+
+
+def possible(constraint: Constraint, vocabulary: Vocabulary) -> list:
+    mask = constraint.mask(vocabulary.codes, vocabulary.presence)
+    return [word for word, kept in zip(vocabulary.words, mask) if kept]
+
+
+def test_repeated_letter_accepted_and_rejected_in_a_guess():
+    vocabulary = Vocabulary.from_words(words)
+    constraint = Constraint().update(parse_line("о -1 о 4 о 0"))
+    left = possible(constraint, vocabulary)
+    assert "город" in left
+    assert all(word.count("о") == 2 for word in left)
+
+
+def test_repeated_letter_accepted_twice_in_a_guess():
+    vocabulary = Vocabulary.from_words(words + ["обруч"])
+    constraint = Constraint().update(parse_line("о -1 о -2"))
+    assert all(word.count("о") >= 2 for word in possible(constraint, vocabulary))
+    assert "обруч" not in possible(constraint, vocabulary)
+
+
+def test_feedback_keeps_the_word_and_matches_patterns():
+    vocabulary = Vocabulary.from_words(words)
+    patterns = compute_patterns(vocabulary.codes, vocabulary.codes, vocabulary.presence)
+    for i, guess in enumerate(words):
+        for j, word in enumerate(words):
+            letters = classify_guess(guess, word)
+            assert pattern_of_letters(letters) == patterns[i, j]
+            left = possible(Constraint().update(letters), vocabulary)
+            assert word in left
+            assert left == [
+                w for k, w in enumerate(words) if patterns[i, k] == patterns[i, j]
+            ]
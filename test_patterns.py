@@ -0,0 +1,31 @@
+import statistics
+
+import numpy as np
+import pytest
+
+from patterns import histogram_max, histogram_mean, histogram_median, histogram_mode
+
+
+def words_left(histogram: np.ndarray) -> list:
+    "Number of words left for each of the targets: the size of its bucket"
+    return [int(size) for size in histogram for _ in range(size)]
+
+
+@pytest.mark.parametrize(
+    "histogram_statistic, statistic",
+    [
+        (histogram_mean, statistics.mean),
+        (histogram_max, max),
+        (histogram_median, statistics.median),
+        (histogram_mode, lambda values: min(statistics.multimode(values))),
+    ],
+)
+def test_histogram_statistics_match_words_left(histogram_statistic, statistic):
+    rng = np.random.default_rng(0)
+    for buckets in (1, 2, 7, 243):
+        targets = rng.integers(1, 60, size=50)
+        histograms = np.zeros((len(targets), buckets), dtype=np.int64)
+        for row, count in enumerate(targets):
+            np.add.at(histograms[row], rng.integers(0, buckets, size=count), 1)
+        expected = [statistic(words_left(histogram)) for histogram in histograms]
+        assert np.allclose(histogram_statistic(histograms), expected)
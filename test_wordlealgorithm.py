@@ -0,0 +1,15 @@
+import numpy as np
+
+from wordlealgorithm import top_indices
+
+
+def test_top_indices_match_stable_sort_with_ties():
+    rng = np.random.default_rng(0)
+    for size in (0, 1, 5, 100, 1000):
+        for levels in (1, 3, 50):
+            scores = rng.integers(0, levels, size=size).astype(np.float64)
+            order = np.argsort(scores, kind="stable")
+            for k in (0, 1, 2, 10, size - 1, size, size + 1):
+                if k < 0:
+                    continue
+                assert np.array_equal(top_indices(scores, k), order[:k])
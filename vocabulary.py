@@ -0,0 +1,212 @@
+from functools import cached_property
+from hashlib import sha256
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+russian_alphabet = "абвгдежзийклмнопрстуфхшщчцьыъэюя"
+word_length = 5
+
+
+def build_code_table(alphabet: str) -> np.ndarray:
+    """
+    Builds a lookup table mapping unicode code points to indices of letters
+    in the alphabet. Code points of letters outside of the alphabet are mapped
+    to the length of the alphabet.
+    """
+    table = np.full(max(map(ord, alphabet)) + 1, len(alphabet), dtype=np.uint8)
+    for i, letter in enumerate(alphabet):
+        table[ord(letter)] = i
+    return table
+
+
+def encode_words(
+    words: Iterable[str], alphabet: str = russian_alphabet, length: int = None
+) -> np.ndarray:
+    """
+    Encodes words as an (N, length) array of indices of letters in the alphabet.
+    The length is taken from the words if not specified.
+    The conversion is done by numpy without calling Python code per word.
+    """
+    array = np.asarray(list(words), dtype=str)
+    if length is None:
+        length = array.dtype.itemsize // 4 if len(array) else word_length
+    if len(array) == 0:
+        return np.zeros((0, length), dtype=np.uint8)
+    if array.dtype.itemsize != 4 * length:
+        raise ValueError(f"All words should consist of exactly {length} letters.")
+    points = array.view(np.uint32).reshape(len(array), length)
+    table = build_code_table(alphabet)
+    if points.min() == 0:
+        raise ValueError(f"All words should consist of exactly {length} letters.")
+    codes = table[np.minimum(points, len(table) - 1)]
+    codes[points >= len(table)] = len(alphabet)
+    if (codes == len(alphabet)).any():
+        raise ValueError("All words should consist of letters from the alphabet.")
+    return codes
+
+
+def presence_dtype(alphabet_size: int) -> type:
+    "Type of bitmasks of letters of the alphabet"
+    if alphabet_size <= 32:
+        return np.uint32
+    if alphabet_size <= 64:
+        return np.uint64
+    raise ValueError("Alphabets of more than 64 letters are not supported.")
+
+
+def presence_masks(
+    codes: np.ndarray, alphabet_size: int = len(russian_alphabet)
+) -> np.ndarray:
+    """
+    For each encoded word computes a bitmask of letters the word contains.
+    """
+    dtype = presence_dtype(alphabet_size)
+    masks = np.zeros(len(codes), dtype=dtype)
+    for position in range(codes.shape[1]):
+        masks |= np.left_shift(dtype(1), codes[:, position].astype(dtype))
+    return masks
+
+
+def letter_count_matrix(codes: np.ndarray, alphabet_size: int) -> np.ndarray:
+    """
+    Computes (N, alphabet size) matrix of numbers of times each letter
+    is met in each of encoded words.
+    """
+    counts = np.zeros((len(codes), alphabet_size), dtype=np.int32)
+    rows = np.arange(len(codes))
+    for position in range(codes.shape[1]):
+        counts[rows, codes[:, position]] += 1
+    return counts
+
+
+def decode_words(codes: np.ndarray, alphabet: str = russian_alphabet) -> List[str]:
+    "Decodes an array of letter codes back into words."
+    points = np.array([ord(letter) for letter in alphabet], dtype=np.uint32)
+    array = np.ascontiguousarray(points[codes]).view(f"<U{codes.shape[1]}")
+    return array.ravel().tolist()
+
+
+class Vocabulary:
+    """
+    Table of all possible words of the same length encoded once as an array of letter codes
+    together with a bitmask of letters present in each word. Words themselves
+    are decoded from the codes only when needed.
+    """
+
+    def __init__(self, codes: np.ndarray, alphabet: str = russian_alphabet) -> None:
+        self.codes = codes
+        self.alphabet = alphabet
+        self.presence = presence_masks(self.codes, len(alphabet))
+
+    @staticmethod
+    def from_words(
+        words: Iterable[str], alphabet: str = russian_alphabet
+    ) -> "Vocabulary":
+        "Encodes the words"
+        return Vocabulary(encode_words(words, alphabet), alphabet)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def length(self) -> int:
+        "Number of letters in each word"
+        return self.codes.shape[1]
+
+    def word(self, index: int) -> str:
+        "Decodes a single word"
+        return "".join(self.alphabet[code] for code in self.codes[index])
+
+    @cached_property
+    def words(self) -> List[str]:
+        "All the words decoded"
+        return decode_words(self.codes, self.alphabet)
+
+    @cached_property
+    def letter_counts(self) -> np.ndarray:
+        "Numbers of times each letter is met in each word"
+        return letter_count_matrix(self.codes, len(self.alphabet))
+
+    @cached_property
+    def letter_presence(self) -> np.ndarray:
+        "Matrix of indicators whether each letter is present in each word"
+        return (self.letter_counts > 0).astype(np.float64)
+
+    @cached_property
+    def index(self) -> "WordIndex":
+        "Index of the words built once and shared by all the games"
+        return WordIndex(self)
+
+    @cached_property
+    def digest(self) -> str:
+        "Hash of the alphabet and the codes of words identifying the vocabulary."
+        content = sha256(self.alphabet.encode("utf-8"))
+        content.update(np.ascontiguousarray(self.codes).tobytes())
+        return content.hexdigest()
+
+
+class WordIndex:
+    """
+    Index of the words of a vocabulary: a hash table of the words to test
+    membership in constant time and the codes sorted lexicographically,
+    which serve as a prefix trie: words sharing a prefix form a contiguous
+    range narrowed down letter by letter by binary search in a column.
+    """
+
+    def __init__(self, vocabulary: Vocabulary) -> None:
+        self.vocabulary = vocabulary
+        self.positions: Dict[str, int] = {
+            word: i for i, word in enumerate(vocabulary.words)
+        }
+        self.order = np.lexsort(vocabulary.codes.T[::-1])
+        # columns of sorted codes, contiguous for binary search
+        self.columns = np.ascontiguousarray(vocabulary.codes[self.order].T)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self.positions
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def find(self, word: str) -> Optional[int]:
+        "Index of the word in the vocabulary or None"
+        return self.positions.get(word)
+
+    def prefix_range(self, prefix: str) -> Tuple[int, int]:
+        "Bounds of the range of sorted words starting with the prefix"
+        start, end = 0, len(self.order)
+        if len(prefix) > self.vocabulary.length:
+            return start, start
+        for position, letter in enumerate(prefix):
+            code = self.vocabulary.alphabet.find(letter)
+            if code < 0:
+                return start, start
+            column = self.columns[position, start:end]
+            start, end = (
+                start + int(np.searchsorted(column, code, "left")),
+                start + int(np.searchsorted(column, code, "right")),
+            )
+            if start == end:
+                break
+        return start, end
+
+    def complete(
+        self,
+        prefix: str,
+        candidates: Optional[np.ndarray] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Words starting with the prefix in the order of the alphabet.
+        If sorted indices of candidates are given, only the candidates are completed.
+        """
+        start, end = self.prefix_range(prefix)
+        indices = self.order[start:end]
+        if candidates is not None:
+            found = np.searchsorted(candidates, indices)
+            kept = found < len(candidates)
+            kept[kept] = candidates[found[kept]] == indices[kept]
+            indices = indices[kept]
+        words = self.vocabulary.words
+        return [words[i] for i in indices[:limit]]
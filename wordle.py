@@ -2,12 +2,17 @@ from random import choice
 from typing import Optional, List
 import os
 import argparse
-from greedy import GreedyAlgorithm
 
-import pandas as pd
-
-from wordlealgorithm import WordleAlgorithm, ManualAlgorithm
-from gameinfo import Letter, classify_letter, load_possible_words
+from wordlealgorithm import (
+    WordleAlgorithm,
+    ManualAlgorithm,
+    make_algorithm,
+    supported_algorithms,
+)
+from gameinfo import Letter, classify_guess
+from dictionary import load_vocabulary
+from vocabulary import Vocabulary, russian_alphabet
+from profiling import profiled, enable, start_turn, end_turn
 
 
 class IncorrectWord(ValueError):
@@ -30,9 +35,17 @@ def parse_args():
     )
     parser.add_argument(
         "--algorithm",
+        choices=supported_algorithms.keys(),
         help="""Algorithm to run. 
         Default: Manual""",
     )
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="profile.json",
+        default=None,
+        help="path to the JSON file to save time of stages per turn and per game to",
+    )
     return parser.parse_args()
 
 
@@ -48,16 +61,17 @@ class GameState:
     according to guesses made.
     """
 
-    def __init__(self, correct_word: str) -> None:
+    def __init__(self, correct_word: str, alphabet: str = russian_alphabet) -> None:
         self.correct_word = correct_word
+        self.alphabet = alphabet
         self.guesses: List[List[Letter]] = []
 
+    @profiled("wordle.add_guess")
     def add_guess(self, guess: str) -> None:
         "New guess"
-        self.guesses.append(
-            [classify_letter(l, i, self.correct_word) for i, l in enumerate(guess)]
-        )
+        self.guesses.append(classify_guess(guess, self.correct_word, self.alphabet))
 
+    @profiled("wordle.print_tabloid")
     def print_tabloid(self) -> None:
         "Prints tabloid"
         clear_screen()
@@ -77,7 +91,7 @@ class GameState:
 
 def play_game(
     correct_word: str,
-    possible_words: pd.DataFrame,
+    possible_words: Vocabulary,
     guesser: Optional[WordleAlgorithm] = None,
 ) -> None:
     """
@@ -87,22 +101,24 @@ def play_game(
     """
     if guesser is None:
         guesser = ManualAlgorithm(possible_words)
-    game_state = GameState(correct_word)
+    game_state = GameState(correct_word, possible_words.alphabet)
     guess = ""
     while True:
+        start_turn()
         game_state.print_tabloid()
         guess = guesser.guess(game_state.game_info)
         print(guess)
         if guess == "":
             break
 
-        if guess not in possible_words["word"].to_list():
+        if guess not in possible_words.index:
             if not isinstance(guesser, ManualAlgorithm):
                 raise IncorrectWord(
                     f"Automatic algorithm returned a word not present in the table of all possible words: {guess}"
                 )
             continue
         game_state.add_guess(guess)
+        end_turn()
 
         if guess == correct_word:
             game_state.print_tabloid()
@@ -116,22 +132,23 @@ def play_game(
 
 def main():
     args = parse_args()
+    profiler = enable() if args.profile is not None else None
 
-    possible_words: pd.DataFrame = load_possible_words(args.t)
-    correct_word: str = (
-        choice(possible_words["word"]) if args.word is None else args.word
-    )
+    possible_words: Vocabulary = load_vocabulary(args.t)
+    correct_word: str = choice(possible_words.words) if args.word is None else args.word
     correct_word = correct_word.lower()
-    if correct_word not in possible_words["word"].to_list():
+    if correct_word not in possible_words.index:
         raise IncorrectWord(
             f'You typed in the word "{correct_word}" which is not in the table of all possible words.'
         )
 
     algorithm = args.algorithm
-    if algorithm == "greedy":
-        algorithm = GreedyAlgorithm(possible_words)
+    if algorithm is not None:
+        algorithm = make_algorithm(algorithm, possible_words)
 
     play_game(correct_word, possible_words, algorithm)
+    if profiler is not None:
+        profiler.save(args.profile)
 
 
 if __name__ == "__main__":
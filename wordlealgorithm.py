@@ -1,52 +1,287 @@
+import shelve
+from copy import copy
 from abc import ABC, abstractmethod
-from typing import List
+from collections import OrderedDict
+from hashlib import sha1
+from importlib import import_module
+from functools import cached_property, wraps
+from threading import Lock
+from typing import Dict, Hashable, Iterator, Optional, Tuple, Union, TYPE_CHECKING
 from string import Template
 
 from gameinfo import (
-    Letter,
+    Constraint,
+    Information,
     RejectedLetter,
     AcceptedLetterWrongPosition,
     AcceptedLetterCorrectPosition,
-    filter_impossible_words,
 )
+from vocabulary import Vocabulary
+from profiling import profiled
 
-import pandas as pd
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class IncorrectWordError:
     "Should be raised when incorrect word was"
 
 
-class WordleAlgorithm(ABC):
+class RankingCache:
+    """
+    Size-bounded cache of results of algorithms shared by all the games.
+    The least recently used entries are evicted first. If the path is
+    specified, entries are also persisted on disk.
+    """
+
+    def __init__(self, capacity: int = 256, path: Optional[str] = None) -> None:
+        self.capacity = capacity
+        self.entries: OrderedDict = OrderedDict()
+        self.disk = shelve.open(path) if path is not None else None
+        self.lock = Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def disk_key(key: Hashable) -> str:
+        return sha1(repr(key).encode("utf-8")).hexdigest()
+
+    def get(self, key: Hashable):
+        "Returns the cached value or None"
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if self.disk is not None and self.disk_key(key) in self.disk:
+                self.disk_hits += 1
+                value = self.disk[self.disk_key(key)]
+                self.store(key, value)
+                return value
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value) -> None:
+        "Caches the value"
+        with self.lock:
+            self.store(key, value)
+            if self.disk is not None:
+                self.disk[self.disk_key(key)] = value
+
+    def store(self, key: Hashable, value) -> None:
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def statistics(self) -> Dict[str, int]:
+        "Counters of hits and misses"
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+        }
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
+
+
+def cached(method):
+    """
+    Decorates a method of an algorithm taking the information and optionally
+    other hashable arguments, so that its results are looked up
+    in the ranking cache of the algorithms first.
+    """
+
+    @wraps(method)
+    def wrapper(self: "WordleAlgorithm", info: Information, *args):
+        if self.ranking_cache is None:
+            return method(self, info, *args)
+        self.update(info)
+        key = (method.__name__, self.cache_key(), self.constraint.key()) + args
+        result = self.ranking_cache.get(key)
+        if result is None:
+            result = method(self, info, *args)
+            self.ranking_cache.put(key, result)
+        return result
+
+    return wrapper
+
+
+def top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k smallest scores in ascending order by partial selection
+    instead of sorting all of them. Ties are resolved in favor of smaller
+    indices, as by the stable sort.
+    """
+    if k >= len(scores):
+        return np.argsort(scores, kind="stable")
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    threshold = np.partition(scores, k - 1)[k - 1]
+    below = np.flatnonzero(scores < threshold)
+    tied = np.flatnonzero(scores == threshold)[: k - len(below)]
+    selected = np.concatenate([below, tied])
+    return selected[np.argsort(scores[selected], kind="stable")]
+
+
+class CandidateTracker:
+    """
+    Keeps track of words still possible as indices of the words in the vocabulary,
+    of the constraint they satisfy and of how many letters have been merged into it.
+    """
+
+    def __init__(self, vocabulary: Vocabulary) -> None:
+        self.vocabulary = vocabulary
+        self.reset()
+
+    def reset(self) -> None:
+        "Makes all the words possible again, e.g. for a new game"
+        self.candidates = np.arange(len(self.vocabulary))
+        self.constraint = Constraint(
+            self.vocabulary.length, len(self.vocabulary.alphabet)
+        )
+        self.applied: Optional[int] = 0
+
+    @profiled("algorithm.update")
+    def update(self, info: Information) -> np.ndarray:
+        """
+        Filters words still possible by the information and returns indices
+        of the words left. Letters added since the last call are merged
+        into the constraint, shorter information than already merged means
+        a new game. A constraint not implying the current one also means a new game.
+        """
+        if isinstance(info, Constraint):
+            if not info.implies(self.constraint):
+                self.reset()
+            constraint = info.copy()
+            self.applied = None
+        else:
+            if self.applied is None or len(info) < self.applied:
+                self.reset()
+            constraint = self.constraint.copy().update(info[self.applied :])
+            self.applied = len(info)
+        if constraint != self.constraint:
+            self.constraint = constraint
+            mask = constraint.mask(
+                self.vocabulary.codes[self.candidates],
+                self.vocabulary.presence[self.candidates],
+            )
+            if not mask.all():
+                eliminated = self.candidates[~mask]
+                self.candidates = self.candidates[mask]
+                self.eliminate(eliminated)
+        return self.candidates
+
+    def eliminate(self, eliminated: np.ndarray) -> None:
+        "Called with indices of the words which have become impossible"
+        pass
+
+    def fork(self) -> "CandidateTracker":
+        """
+        Copy sharing the vocabulary and everything precomputed,
+        but keeping track of the words still possible on its own,
+        e.g. to rank guesses in another thread.
+        """
+        fork = copy(self)
+        fork.constraint = self.constraint.copy()
+        return fork
+
+
+class WordleAlgorithm(CandidateTracker, ABC):
     """
     Abstract base class for an wordle algorithm.
     Should be able to make a guess based on words possible and information gained.
     """
 
-    def __init__(self, possible_words: pd.DataFrame) -> None:
-        self.possible_words = possible_words
+    # cache of rankings shared by all the instances, disabled if None
+    ranking_cache: Optional[RankingCache] = None
+
+    def __init__(self, possible_words: Union["pd.DataFrame", Vocabulary]) -> None:
+        if not isinstance(possible_words, Vocabulary):
+            self.all_words = possible_words.reset_index(drop=True)
+            possible_words = Vocabulary.from_words(self.all_words["word"])
+        super().__init__(possible_words)
+
+    @cached_property
+    def all_words(self) -> "pd.DataFrame":
+        "Table of all the words, pandas is imported only when the table is needed"
+        import pandas as pd
+
+        return pd.DataFrame({"word": self.vocabulary.words})
+
+    @property
+    def possible_words(self) -> "pd.DataFrame":
+        "Table of words which are still possible"
+        return self.all_words.iloc[self.candidates]
+
+    def cache_key(self) -> Tuple:
+        "Identifies the algorithm, its settings and the vocabulary in the cache"
+        return (type(self).__name__, self.vocabulary.digest)
 
     @abstractmethod
-    def guess(self, info: List[Letter]) -> str:
+    def guess(self, info: Information) -> str:
         "Makes a guess"
         pass
 
     @abstractmethod
-    def rank_guesses(self, info: List[Letter]) -> pd.DataFrame:
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
         "Ranks all possible words."
         pass
 
+    def top_guesses(self, info: Information, k: int) -> "pd.DataFrame":
+        """
+        Top k rows of the ranking. Algorithms able to select the best guesses
+        without ranking all of them override it, by default all are ranked.
+        """
+        return self.rank_guesses(info).head(k)
+
+    def rank_progressively(
+        self, info: Information, n: int, deadline: Optional[float] = None
+    ) -> Iterator[Tuple["pd.DataFrame", bool]]:
+        """
+        Yields top n guesses refined over time together with whether
+        the ranking is final. Stops refining after the deadline given
+        as a value of time.perf_counter. Selects the top at once by default.
+        """
+        yield self.top_guesses(info, n), True
+
 
 class ManualAlgorithm(WordleAlgorithm):
-    def __init__(self, possible_words: pd.DataFrame) -> None:
+    # number of words listed when a prefix is completed
+    completions = 20
+
+    def __init__(self, possible_words: Union["pd.DataFrame", Vocabulary]) -> None:
         super().__init__(possible_words)
         self.print_instruction()
 
-    def guess(self, info: List[Letter]) -> str:
-        return input().strip().lower()
+    def guess(self, info: Information) -> str:
+        """
+        Reads the guess of the player. A prefix ending with "?" lists
+        the words still possible starting with it instead.
+        """
+        self.update(info)
+        while True:
+            guess = input().strip().lower()
+            if not guess.endswith("?"):
+                return guess
+            prefix = guess[:-1]
+            words = self.vocabulary.index.complete(
+                prefix, self.candidates, self.completions
+            )
+            if words:
+                print(*words)
+            else:
+                print(f'No possible words start with "{prefix}".')
 
-    def rank_guesses(self, info: List[Letter]) -> pd.DataFrame:
-        return filter_impossible_words(self.possible_words, info)
+    def rank_guesses(self, info: Information) -> "pd.DataFrame":
+        self.update(info)
+        return self.possible_words
 
     def print_instruction(self):
         with open("./player_instruction.txt") as f:
@@ -60,3 +295,24 @@ class ManualAlgorithm(WordleAlgorithm):
         )
         print(instruction)
         input("Press Enter to start!")
+
+
+supported_algorithms = {
+    "manual": "wordlealgorithm.ManualAlgorithm",
+    "greedy": "greedy.GreedyAlgorithm",
+    "cutting": "biggest_cut.CuttingAlgorithm",
+    "tree": "decisiontree.DecisionTreeAlgorithm",
+    "lookahead": "lookahead.LookaheadAlgorithm",
+}
+
+
+def make_algorithm(
+    name: str, possible_words: Union["pd.DataFrame", Vocabulary], **options
+) -> WordleAlgorithm:
+    """
+    Makes an instance of the algorithm registered under the name.
+    The module implementing the algorithm is imported on demand.
+    """
+    module_name, class_name = supported_algorithms[name].rsplit(".", 1)
+    algorithm = getattr(import_module(module_name), class_name)
+    return algorithm(possible_words, **options)